@@ -0,0 +1,18 @@
+"""依次运行全部基准测试，每项在独立子进程中执行，使峰值内存互不影响
+
+用法: python -m benchmarks
+"""
+import subprocess
+import sys
+
+SUITES = ["benchmarks.bench_crawler", "benchmarks.bench_downloader", "benchmarks.bench_file_engines",
+          "benchmarks.bench_workers", "benchmarks.bench_plan",
+          "benchmarks.bench_verify", "benchmarks.bench_index", "benchmarks.bench_extract"]
+
+def main():
+    for module in SUITES:
+        print(f"# {module}", flush=True)
+        subprocess.run([sys.executable, "-m", module], check=False)
+
+if __name__ == "__main__":
+    main()
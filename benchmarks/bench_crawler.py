@@ -0,0 +1,63 @@
+"""PageDownloader 在本地模拟服务器上的爬取吞吐
+
+用法: python -m benchmarks.bench_crawler --files 5000 --latency 0.02
+"""
+import argparse
+import json
+import shutil
+import tempfile
+from pathlib import Path
+from src.config.default_session import get_default_session
+from src.pages import PageDownloader
+from .common import peak_rss_mb, quiet_loggers, report, timer
+from .server import StandInServer
+
+DATA_SET = 1
+
+def run(server: StandInServer, workdir: Path, label: str, **kwargs) -> dict:
+    session = server.session(get_default_session())
+    downloader = PageDownloader(session=session, base_url=server.index_url, dir_path=workdir, **kwargs)
+    downloader.random_sleep = lambda: None
+    requests_before = server.request_count
+    counts_before = server.counts.copy()
+    with timer() as t:
+        downloader.download_original_webpage(DATA_SET)
+    with open(workdir / f"data-set-{DATA_SET}" / f"dataset{DATA_SET}_file_links.json") as f:
+        data = json.load(f)
+    links = sum(len(v) for v in data.values())
+    return {
+        "bench": "crawler",
+        "mode": label,
+        "seconds": t["seconds"],
+        "pages": len(data),
+        "pages/s": round(len(data) / t["seconds"], 1),
+        "links": links,
+        "requests": server.request_count - requests_before,
+        "responses": dict(server.counts - counts_before),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="页面爬取基准测试")
+    parser.add_argument("--files", type=int, default=5000, help="数据集中的文件数")
+    parser.add_argument("--per-page", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.02, help="模拟服务器响应延迟(秒)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="429 响应比例")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=50.0, help="并发爬取的限速(次/秒)")
+    args = parser.parse_args(argv)
+    quiet_loggers("dataset_downloader")
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_crawler_"))
+    error_rates = {429: args.error_rate} if args.error_rate else None
+    try:
+        with StandInServer(latency=args.latency, data_sets={DATA_SET: args.files}, per_page=args.per_page,
+                           error_rates=error_rates) as server:
+            report(run(server, workdir / "sequential", "sequential", max_workers=1))
+            report(run(server, workdir / "pager", f"pager({args.workers})", max_workers=args.workers, rate_limit=args.rate))
+            report(run(server, workdir / "pager", "incremental", max_workers=args.workers, rate_limit=args.rate))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
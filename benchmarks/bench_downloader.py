@@ -0,0 +1,75 @@
+"""FileDownloader 在本地模拟服务器上的下载吞吐，包括限流、截断等异常情况
+
+用法: python -m benchmarks.bench_downloader --files 2000 --size 65536 --error-rate 0.02
+"""
+import argparse
+import json
+import shutil
+import tempfile
+from pathlib import Path
+from src.config.default_session import get_default_session
+from src.files import FileDownloader
+from .common import peak_rss_mb, quiet_loggers, report, timer
+from .server import StandInServer
+
+DATA_SET = 1
+
+def write_links(server: StandInServer, page_dir: Path):
+    """按模拟服务器的列表页生成与 page 命令相同格式的链接JSON"""
+    data = {str(page): server.page_links(DATA_SET, page) for page in range(server.last_page(DATA_SET) + 1)}
+    out = page_dir / f"data-set-{DATA_SET}"
+    out.mkdir(parents=True, exist_ok=True)
+    with open(out / f"dataset{DATA_SET}_file_links.json", "w") as f:
+        json.dump(data, f)
+
+def run(server: StandInServer, workdir: Path, label: str, **kwargs) -> dict:
+    session = server.session(get_default_session())
+    downloader = FileDownloader(session, workdir / "files", page_dir=workdir / "pages", **kwargs)
+    quiet_loggers(downloader.logger.name)
+    requests_before = server.request_count
+    counts_before = server.counts.copy()
+    with timer() as t:
+        downloader.start_download(DATA_SET)
+    rows = downloader.manifest.conn.execute(
+        "SELECT status, COUNT(*), SUM(bytes) FROM downloads WHERE data_set = ? GROUP BY status", (DATA_SET,)).fetchall()
+    stats = {status: (count, nbytes or 0) for status, count, nbytes in rows}
+    success, nbytes = stats.get("success", (0, 0))
+    return {
+        "bench": "downloader",
+        "mode": label,
+        "seconds": t["seconds"],
+        "files/s": round(success / t["seconds"], 1),
+        "MB/s": round(nbytes / t["seconds"] / 1024 / 1024, 2),
+        "success": success,
+        "failed": stats.get("failed", (0, 0))[0],
+        "requests": server.request_count - requests_before,
+        "responses": dict(server.counts - counts_before),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="文件下载基准测试")
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--size", type=int, default=64 * 1024, help="单个文件大小(bytes)")
+    parser.add_argument("--latency", type=float, default=0.02, help="模拟服务器响应延迟(秒)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="403/429/503 响应的总比例")
+    parser.add_argument("--truncate-rate", type=float, default=0.0, help="响应体被截断的比例")
+    parser.add_argument("--bandwidth", type=int, default=0, help="单连接限速(bytes/s)，0为不限速")
+    parser.add_argument("--workers", type=int, default=6)
+    args = parser.parse_args(argv)
+
+    error_rates = {status: args.error_rate / 3 for status in (403, 429, 503)} if args.error_rate else None
+    workdir = Path(tempfile.mkdtemp(prefix="bench_downloader_"))
+    try:
+        with StandInServer(file_size=args.size, latency=args.latency, data_sets={DATA_SET: args.files},
+                           error_rates=error_rates, truncate_rate=args.truncate_rate, bandwidth=args.bandwidth) as server:
+            write_links(server, workdir / "pages")
+            report(run(server, workdir, f"fixed({args.workers})", max_workers=args.workers, adaptive=False))
+            report(run(server, workdir, "resume", max_workers=args.workers, adaptive=False))
+            shutil.rmtree(workdir / "files")
+            report(run(server, workdir, f"adaptive(2-{args.workers})", max_workers=args.workers, adaptive=True))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""链接提取与重复计数的微基准：用仓库中 pages/ 的链接JSON生成列表页HTML，对比逐次编译正则、预编译整页提取与分块流式提取
+
+用法: python -m benchmarks.bench_extract [--repeat 3] [--chunk 16384] [--filler 40000]
+"""
+import argparse
+import json
+import re
+import time
+from pathlib import Path
+from urllib.parse import unquote
+from src.config import PAGE_DIR
+from src.pages import LinkExtractor, DuplicateCounter
+from src.pages.extractor import DEFAULT_FILE_PATTERN
+from .common import peak_rss_mb, report
+
+def load_link_data(page_dir: Path) -> dict[int, dict[str, list[str]]]:
+    """读取 pages/ 下各数据集的链接JSON"""
+    data = {}
+    for path in sorted(page_dir.glob("data-set-*/dataset*_file_links.json")):
+        number = int(path.parent.name.rsplit("-", 1)[-1])
+        with open(path, "r") as f:
+            data[number] = json.load(f)
+    return data
+
+def listing_html(data_set_number: int, page: int, last_page: int, links: list[str], filler: int) -> str:
+    """按线上列表页的结构生成HTML：页头导航与脚本等无关内容、文件列表、分页器"""
+    head = ('<html><head><script>' + "var analytics = {};" * (filler // 40) + '</script></head><body>'
+            '<nav>' + "".join(f'<a href="/epstein/doj-disclosures/data-set-{n}-files">Data Set {n}</a>' for n in range(1, 13))
+            + '</nav><div class="view-content"><ul>')
+    rows = "".join(f'<li class="views-row"><a href="{link}">{unquote(link.rsplit("/", 1)[-1])}</a></li>' for link in links)
+    pager = ('<nav class="pager"><ul>'
+             + "".join(f'<li class="pager__item"><a href="?page={p}">{p + 1}</a></li>'
+                       for p in range(max(0, page - 4), min(last_page, page + 4) + 1))
+             + f'<li class="pager__item pager__item--last"><a href="?page={last_page}">Last</a></li></ul></nav>')
+    return head + rows + '</ul></div>' + pager + '<footer>' + "&nbsp;" * (filler // 60) + '</footer></body></html>'
+
+def legacy_findall(text: str) -> list[str]:
+    """原实现：每次调用重新编译正则"""
+    pattern = re.compile(DEFAULT_FILE_PATTERN)
+    return pattern.findall(text)
+
+def legacy_check_repeats(data: dict[str, list[str]]) -> tuple[int, int]:
+    """原实现：先展开为完整列表再去重"""
+    all_value_list = []
+    for new_links in data.values():
+        for new_link in new_links:
+            all_value_list.append(new_link)
+    return len(all_value_list), len(all_value_list) - len(set(all_value_list))
+
+def chunked(body: bytes, size: int):
+    """模拟 iter_content(decode_unicode=True) 逐块解码"""
+    decoder = __import__("codecs").getincrementaldecoder("utf-8")()
+    for i in range(0, len(body), size):
+        yield decoder.decode(body[i:i + size])
+
+def measure(name: str, pages: list[tuple[bytes, list[str]]], repeat: int, extract) -> dict:
+    total_bytes = sum(len(body) for body, _ in pages)
+    best = float("inf")
+    mismatched = 0
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        results = [extract(body) for body, _ in pages]
+        best = min(best, time.perf_counter() - begin)
+        mismatched = sum(1 for links, (_, expected) in zip(results, pages) if links != expected)
+    return {
+        "engine": name,
+        "pages": len(pages),
+        "ms": round(best * 1000, 2),
+        "pages/s": round(len(pages) / best, 1),
+        "MB/s": round(total_bytes / best / 1024 / 1024, 1),
+        "mismatched_pages": mismatched,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="链接提取微基准")
+    parser.add_argument("--page-dir", type=Path, default=PAGE_DIR)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--chunk", type=int, default=16 * 1024, help="流式提取的块大小")
+    parser.add_argument("--filler", type=int, default=40000, help="每页与链接无关的HTML字符数")
+    args = parser.parse_args()
+
+    link_data = load_link_data(args.page_dir)
+    pages: list[tuple[bytes, list[str]]] = []
+    for data_set_number, data in link_data.items():
+        last_page = max(int(page) for page in data)
+        for page, links in data.items():
+            html = listing_html(data_set_number, int(page), last_page, links, args.filler)
+            pages.append((html.encode("utf-8"), links))
+
+    extractor = LinkExtractor()
+    with_metadata = LinkExtractor(metadata=True)
+    report(measure("legacy(recompile+decode)", pages, args.repeat, lambda body: legacy_findall(body.decode("utf-8"))))
+    report(measure("precompiled", pages, args.repeat, lambda body: extractor.extract(body.decode("utf-8"))))
+    report(measure(f"streaming({args.chunk})", pages, args.repeat,
+                   lambda body: list(extractor.scan().iter_chunks(chunked(body, args.chunk)))))
+    report(measure(f"streaming+metadata({args.chunk})", pages, args.repeat,
+                   lambda body: [link.url for link in with_metadata.scan().iter_chunks(chunked(body, args.chunk))]))
+    report(measure(f"streaming+pager({args.chunk})", pages, args.repeat,
+                   lambda body: list(extractor.scan(pager=True).iter_chunks(chunked(body, args.chunk)))))
+
+    for label, count in (("legacy", legacy_check_repeats), ("streaming_set", None)):
+        begin = time.perf_counter()
+        totals = []
+        for data in link_data.values():
+            if count is not None:
+                totals.append(count(data))
+            else:
+                counter = DuplicateCounter()
+                for links in data.values():
+                    counter.add(links)
+                totals.append((counter.total, counter.duplicates))
+        report({
+            "check_repeats": label,
+            "ms": round((time.perf_counter() - begin) * 1000, 2),
+            "links": sum(total for total, _ in totals),
+            "duplicates": sum(duplicates for _, duplicates in totals),
+        })
+    report({"peak_rss_mb": peak_rss_mb()})
+
+if __name__ == "__main__":
+    main()
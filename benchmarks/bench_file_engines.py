@@ -0,0 +1,72 @@
+"""对比线程池与 asyncio 两种下载引擎在本地模拟服务器上的吞吐
+
+用法: python -m benchmarks.bench_file_engines --files 2000 --size 65536 --latency 0.05
+"""
+import argparse
+import json
+import logging
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from src.config import session
+from src.files import FileDownloader, AsyncFileDownloader
+from .server import StandInServer
+
+DATA_SET = 1
+
+def write_links(page_dir: Path, server: StandInServer, files: int, per_page: int = 50):
+    """生成与 page 命令相同格式的链接JSON"""
+    links = [server.file_url(DATA_SET, i) for i in range(files)]
+    data = {str(page): links[i:i + per_page] for page, i in enumerate(range(0, files, per_page))}
+    out = page_dir / f"data-set-{DATA_SET}"
+    out.mkdir(parents=True, exist_ok=True)
+    with open(out / f"dataset{DATA_SET}_file_links.json", "w") as f:
+        json.dump(data, f)
+
+def run_engine(name: str, downloader: FileDownloader, server: StandInServer, file_size: int) -> dict:
+    downloader.logger.setLevel(logging.WARNING)
+    requests_before = server.request_count
+    begin = time.perf_counter()
+    downloader.start_download(DATA_SET)
+    elapsed = time.perf_counter() - begin
+    with open(downloader.file_dir / f"data-set-{DATA_SET}" / "downloads_status.json", encoding="utf-8") as f:
+        report = json.load(f)
+    success = sum(1 for statuses in report.values() for s in statuses.values() if s == "success")
+    return {
+        "engine": name,
+        "seconds": round(elapsed, 3),
+        "files/s": round(success / elapsed, 1),
+        "MB/s": round(success * file_size / elapsed / 1024 / 1024, 2),
+        "success": success,
+        "requests": server.request_count - requests_before,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="下载引擎基准测试")
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--size", type=int, default=64 * 1024, help="单个文件大小(bytes)")
+    parser.add_argument("--latency", type=float, default=0.05, help="模拟服务器响应延迟(秒)")
+    parser.add_argument("--threads", type=int, default=6, help="线程池引擎的线程数")
+    parser.add_argument("--connections", type=int, default=200, help="async 引擎的连接上限")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_engines_"))
+    results = []
+    try:
+        with StandInServer(file_size=args.size, latency=args.latency) as server:
+            page_dir = workdir / "pages"
+            write_links(page_dir, server, args.files)
+            thread_downloader = FileDownloader(session, workdir / "thread", max_workers=args.threads, page_dir=page_dir,
+                                               adaptive=False)
+            results.append(run_engine(f"thread({args.threads})", thread_downloader, server, args.size))
+            async_downloader = AsyncFileDownloader(session, workdir / "async", max_connections=args.connections,
+                                                   max_per_host=args.connections, page_dir=page_dir, adaptive=False)
+            results.append(run_engine(f"async({args.connections})", async_downloader, server, args.size))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    for result in results:
+        print(json.dumps(result, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""全文索引的建立、增量更新与检索耗时
+
+用法: python -m benchmarks.bench_index --files 2000 --words 300
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from src.search import TextIndex, Indexer
+from .common import quiet_loggers, report
+
+DATA_SET = 1
+_VOCABULARY = ("flight manifest island deposition subpoena witness schedule palm beach aircraft passenger "
+               "account transfer agreement settlement counsel interview statement exhibit record photograph").split()
+
+def text_pdf(text: str) -> bytes:
+    """生成只有一页文本的最小PDF（含正确的xref偏移）"""
+    lines = [text[i:i + 80] for i in range(0, len(text), 80)]
+    stream = "BT /F1 10 Tf 40 800 Td 12 TL " + " ".join(
+        "(" + line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ") '" for line in lines) + " ET"
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] /Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>",
+        f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    body = b"%PDF-1.4\n"
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(body))
+        body += f"{number} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(body)
+    body += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    body += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    body += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return body
+
+def populate(workdir: Path, files: int, words: int, per_page: int = 50) -> dict[str, list[str]]:
+    rng = random.Random(0)
+    links: dict[str, list[str]] = {}
+    for i in range(files):
+        page = i // per_page
+        name = f"EFTA{i:08d}.pdf"
+        links.setdefault(str(page), []).append(f"https://www.justice.gov/epstein/files/DataSet%20{DATA_SET}/{name}")
+        text = f"document {name} " + " ".join(rng.choice(_VOCABULARY) for _ in range(words))
+        path = workdir / "files" / f"data-set-{DATA_SET}" / f"page_{page}" / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(text_pdf(text))
+    out = workdir / "pages" / f"data-set-{DATA_SET}"
+    out.mkdir(parents=True, exist_ok=True)
+    with open(out / f"dataset{DATA_SET}_file_links.json", "w") as f:
+        json.dump(links, f)
+    return links
+
+def main():
+    parser = argparse.ArgumentParser(description="全文索引基准测试")
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--words", type=int, default=300, help="每个文件的词数")
+    parser.add_argument("--workers", type=int, default=0, help="提取进程数，0为CPU核数")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_index_"))
+    try:
+        populate(workdir, args.files, args.words)
+        index = TextIndex(workdir / "search.sqlite3")
+        indexer = Indexer(workdir / "files", workdir / "pages", index, max_workers=args.workers or None)
+        quiet_loggers(indexer.logger.name)
+        first = indexer.run(DATA_SET)
+        second = indexer.run(DATA_SET)
+        # 一部分文件只更新mtime（哈希不变），一部分改写内容，一个删除
+        page_dir = workdir / "files" / f"data-set-{DATA_SET}" / "page_0"
+        names = sorted(page_dir.iterdir())
+        for path in names[:10]:
+            os.utime(path, ns=(time.time_ns(), time.time_ns() + 1_000_000_000))
+        for path in names[10:15]:
+            path.write_bytes(text_pdf("replaced content with the word zeppelin"))
+        names[15].unlink()
+        third = indexer.run(DATA_SET)
+        queries = ["flight", "\"palm beach\"", "zeppelin", "depos*", "EFTA00000042", "witness AND aircraft"]
+        timings = {}
+        for query in queries:
+            begin = time.perf_counter()
+            results = index.search(query)
+            timings[query] = {"ms": round((time.perf_counter() - begin) * 1000, 2), "hits": len(results)}
+        index.close()
+        report({"files": args.files, "build": first, "rerun": second, "update": third, "search": timings})
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
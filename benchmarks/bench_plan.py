@@ -0,0 +1,59 @@
+"""大小勘测后按从大到小下载与按页面顺序下载的整体耗时对比：少数大文件排在最后时，页面顺序会在末尾只剩一个线程下载
+
+用法: python -m benchmarks.bench_plan --files 400 --large 4 --large-size 8388608 --bandwidth 2097152
+"""
+import argparse
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from requests import Session
+from src.files import FileDownloader
+from .bench_file_engines import DATA_SET, write_links
+from .common import quiet_loggers, report
+from .server import StandInServer
+
+def run(server: StandInServer, workdir: Path, label: str, threads: int, plan: bool) -> dict:
+    downloader = FileDownloader(server.session(Session()), workdir / label, page_dir=workdir / "pages",
+                                max_workers=threads, adaptive=False, plan_rate_limit=0)
+    quiet_loggers(downloader.logger.name)
+    plan_seconds = 0.0
+    requests_before = server.request_count
+    if plan:
+        begin = time.perf_counter()
+        downloader.plan(DATA_SET)
+        plan_seconds = time.perf_counter() - begin
+    begin = time.perf_counter()
+    downloader.start_download(DATA_SET)
+    elapsed = time.perf_counter() - begin
+    downloader.manifest.close()
+    return {
+        "order": label,
+        "plan_seconds": round(plan_seconds, 3),
+        "download_seconds": round(elapsed, 3),
+        "requests": server.request_count - requests_before,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="下载顺序（整体耗时）基准测试")
+    parser.add_argument("--files", type=int, default=400)
+    parser.add_argument("--size", type=int, default=64 * 1024, help="小文件大小(bytes)")
+    parser.add_argument("--large", type=int, default=4, help="位于最后一页的大文件数")
+    parser.add_argument("--large-size", type=int, default=8 * 1024 * 1024)
+    parser.add_argument("--bandwidth", type=int, default=2 * 1024 * 1024, help="每个连接的带宽(bytes/s)")
+    parser.add_argument("--threads", type=int, default=6)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_plan_"))
+    try:
+        with StandInServer(file_size=args.size, bandwidth=args.bandwidth, require_cookie=False) as server:
+            server.file_sizes.update({f"EFTA{index:08d}.pdf": args.large_size
+                                      for index in range(args.files - args.large, args.files)})
+            write_links(workdir / "pages", server, args.files)
+            report(run(server, workdir, "page", args.threads, plan=False))
+            report(run(server, workdir, "largest_first", args.threads, plan=True))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""verify 命令的校验吞吐，以及问题文件（截断、年龄验证页HTML、空文件）能否被发现并重新下载
+
+用法: python -m benchmarks.bench_verify --files 20000 --size 65536 --bad 30 --media 40 [--hash]
+"""
+import argparse
+import json
+import shutil
+import tempfile
+from pathlib import Path
+from requests import Session
+from src.files import FileDownloader
+from .bench_file_engines import DATA_SET, write_links
+from .common import quiet_loggers, report, timer
+from .server import StandInServer, file_body, pdf_body, _INTERSTITIAL
+
+# 链接数据中的非PDF文件（视频、音频、表格），文件头与PDF无关，校验时不应判为 not_pdf / no_eof
+_MEDIA_HEADS = {
+    ".mp4": b"\x00\x00\x00\x20ftypisom\x00\x00\x02\x00isomiso2avc1mp41",
+    ".wav": b"RIFF\x24\x08\x00\x00WAVEfmt ",
+    ".xlsx": b"PK\x03\x04\x14\x00\x06\x00\x08\x00\x00\x00!\x00",
+    ".csv": b"date,flight,passenger\n",
+}
+
+def add_media_links(page_dir: Path, count: int):
+    """在链接JSON末尾追加一页非PDF文件链接，沿用已有链接的前缀"""
+    links_path = page_dir / f"data-set-{DATA_SET}" / f"dataset{DATA_SET}_file_links.json"
+    with open(links_path) as f:
+        data = json.load(f)
+    prefix = data["0"][0].rsplit("/", 1)[0]
+    suffixes = list(_MEDIA_HEADS)
+    data[str(len(data))] = [f"{prefix}/MEDIA{i:05d}{suffixes[i % len(suffixes)]}" for i in range(count)]
+    with open(links_path, "w") as f:
+        json.dump(data, f)
+
+def body_for(url: str, server: StandInServer, size: int) -> bytes:
+    name = url.removeprefix(server.base_url)
+    suffix = "." + url.rsplit(".", 1)[-1].lower()
+    if suffix in _MEDIA_HEADS:
+        return _MEDIA_HEADS[suffix] + file_body(name, max(0, size - len(_MEDIA_HEADS[suffix])))
+    return pdf_body(name, size)
+
+def populate(downloader: FileDownloader, server: StandInServer, files: int, size: int, per_page: int = 50):
+    """不经网络直接生成已下载完成的文件并登记为成功"""
+    downloader.register_links(DATA_SET)
+    for folder, url in downloader.manifest.select(DATA_SET, ("pending",)):
+        file_path = Path(folder) / url.rsplit("/", 1)[-1]
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_bytes(body_for(url, server, size))
+        downloader.manifest.record(DATA_SET, url, "success", size)
+        downloader.mark_complete(url, file_path)
+    downloader.manifest.flush()
+
+def corrupt(downloader: FileDownloader, count: int) -> dict[str, str]:
+    """按顺序轮流截断、替换为HTML、清空 count 个文件"""
+    damaged = {}
+    rows = [row for row in downloader.manifest.select(DATA_SET, ("success",)) if row[1].endswith(".pdf")]
+    step = max(1, len(rows) // max(1, count))
+    for i, (folder, url) in enumerate(rows[::step][:count]):
+        file_path = Path(folder) / url.rsplit("/", 1)[-1]
+        kind = ("size_mismatch", "html", "empty")[i % 3]
+        if kind == "size_mismatch":
+            data = file_path.read_bytes()
+            file_path.write_bytes(data[:len(data) // 2])
+        elif kind == "html":
+            file_path.write_bytes(_INTERSTITIAL)
+        else:
+            file_path.write_bytes(b"")
+        damaged[url] = kind
+    return damaged
+
+def main():
+    parser = argparse.ArgumentParser(description="下载文件校验基准测试")
+    parser.add_argument("--files", type=int, default=20000)
+    parser.add_argument("--size", type=int, default=64 * 1024)
+    parser.add_argument("--bad", type=int, default=30)
+    parser.add_argument("--media", type=int, default=40, help="追加的非PDF（mp4/wav/xlsx/csv）完好文件数")
+    parser.add_argument("--workers", type=int, default=0, help="校验进程数，0为CPU核数")
+    parser.add_argument("--hash", action="store_true")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_verify_"))
+    try:
+        with StandInServer(file_size=args.size, require_cookie=False) as server:
+            write_links(workdir / "pages", server, args.files)
+            if args.media:
+                add_media_links(workdir / "pages", args.media)
+            downloader = FileDownloader(server.session(Session()), workdir / "files", page_dir=workdir / "pages",
+                                        adaptive=False)
+            quiet_loggers(downloader.logger.name)
+            populate(downloader, server, args.files, args.size)
+            damaged = corrupt(downloader, args.bad)
+            with timer() as elapsed:
+                summary = downloader.verify(DATA_SET, want_hash=args.hash, max_workers=args.workers or None)
+            requests_before = server.request_count
+            downloader.start_download(DATA_SET)
+            second = downloader.verify(DATA_SET, max_workers=args.workers or None)
+            report({
+                "files": args.files,
+                "seconds": elapsed["seconds"],
+                "files/s": round(args.files / elapsed["seconds"], 1),
+                "damaged": len(damaged),
+                "media": args.media,
+                "detected": summary["bad"],
+                "reasons": summary["reasons"],
+                "redownload_requests": server.request_count - requests_before,
+                "bad_after_redownload": second["bad"],
+            })
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
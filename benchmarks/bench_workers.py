@@ -0,0 +1,83 @@
+"""多个下载进程共用一个清单：以租约认领或按 --shard 静态分片，统计吞吐与重复下载
+
+用法: python -m benchmarks.bench_workers --processes 4 --files 2000 --latency 0.02 [--mode shard] [--kill]
+
+--kill 在下载过程中强制结束一个进程，其持有的租约过期后由其余进程重新认领（续传其 .part）；
+该进程已下载但尚未提交到清单的文件会被重新下载，计入 downloaded_twice
+"""
+import argparse
+import multiprocessing
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from requests import Session
+from src.files import FileDownloader
+from src.files.manifest import DownloadManifest
+from .bench_file_engines import DATA_SET, write_links
+from .common import quiet_loggers, report
+from .server import StandInServer, pdf_body
+
+def worker(file_dir: str, page_dir: str, mode: str, index: int, count: int, threads: int, lease_seconds: float):
+    downloader = FileDownloader(Session(), file_dir, page_dir=page_dir, max_workers=threads, adaptive=False,
+                                lease=mode == "lease", lease_seconds=lease_seconds, lease_batch=20,
+                                shard=(index, count) if mode == "shard" else None)
+    quiet_loggers(downloader.logger.name)
+    downloader.start_download(DATA_SET)
+
+def main():
+    parser = argparse.ArgumentParser(description="多进程协作下载基准测试")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--size", type=int, default=64 * 1024)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--threads", type=int, default=4, help="每个进程的下载线程数")
+    parser.add_argument("--mode", choices=["lease", "shard"], default="lease")
+    parser.add_argument("--lease-seconds", type=float, default=3.0)
+    parser.add_argument("--kill", action="store_true", help="下载中途强制结束第一个进程")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_workers_"))
+    context = multiprocessing.get_context("spawn")
+    try:
+        with StandInServer(file_size=args.size, latency=args.latency, require_cookie=False) as server:
+            page_dir = workdir / "pages"
+            write_links(page_dir, server, args.files)
+            begin = time.perf_counter()
+            processes = [context.Process(target=worker, args=(str(workdir / "files"), str(page_dir), args.mode, index,
+                                                              args.processes, args.threads, args.lease_seconds))
+                         for index in range(args.processes)]
+            for process in processes:
+                process.start()
+            if args.kill:
+                time.sleep(2.0)
+                processes[0].kill()
+            for process in processes:
+                process.join()
+            elapsed = time.perf_counter() - begin
+
+            manifest = DownloadManifest(workdir / "files" / "manifest.sqlite3")
+            success = dict(manifest.conn.execute(
+                "SELECT status, COUNT(*) FROM downloads WHERE data_set = ? GROUP BY status", (DATA_SET,)).fetchall())
+            manifest.close()
+            corrupt = 0
+            for path in server.file_bodies:
+                local = next((workdir / "files").rglob(path.rsplit("/", 1)[-1]), None)
+                if local is None or local.read_bytes() != pdf_body(path, args.size):
+                    corrupt += 1
+            report({
+                "mode": args.mode,
+                "processes": args.processes,
+                "killed": args.kill,
+                "seconds": round(elapsed, 3),
+                "files/s": round(success.get("success", 0) / elapsed, 1),
+                "statuses": success,
+                "full_downloads": sum(server.file_bodies.values()),
+                "downloaded_twice": sum(1 for count in server.file_bodies.values() if count > 1),
+                "missing_or_corrupt": corrupt + args.files - len(server.file_bodies),
+            })
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+import json
+import logging
+import resource
+import sys
+import time
+from contextlib import contextmanager
+
+def peak_rss_mb() -> float:
+    """当前进程的峰值常驻内存(MB)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以 byte 为单位
+    return round(peak / 1024 / (1024 if sys.platform == "darwin" else 1), 1)
+
+def quiet_loggers(*names: str):
+    """基准测试时只保留警告以上的日志，避免控制台输出影响计时"""
+    for name in names:
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+@contextmanager
+def timer():
+    result = {}
+    begin = time.perf_counter()
+    yield result
+    result["seconds"] = round(time.perf_counter() - begin, 3)
+
+def report(result: dict):
+    print(json.dumps(result, ensure_ascii=False), flush=True)
@@ -0,0 +1,268 @@
+import hashlib
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, urlsplit, urlunsplit
+from requests import Session
+from src.transport import TransportAdapter
+
+_RANGE_RE = re.compile(r"bytes=(\d+)-(\d*)")
+_DATA_SET_RE = re.compile(r"/epstein/doj-disclosures/data-set-(\d+)-files/?$")
+_FILE_RE = re.compile(r"/epstein/files/DataSet%20(\d+)/EFTA(\d+)\.pdf$")
+_AGE_COOKIE = "justiceGovAgeVerified=true"
+_INTERSTITIAL = b"<html><body><h1>Age Verification</h1><form>Are you 18 or older?</form></body></html>"
+_LAST_MODIFIED = "Thu, 01 Jan 2026 00:00:00 GMT"
+
+def file_body(name: str, size: int) -> bytes:
+    """根据文件名生成确定性的文件内容，便于校验"""
+    seed = hashlib.sha256(name.encode("utf-8")).digest()
+    return (seed * (size // len(seed) + 1))[:size]
+
+def pdf_body(name: str, size: int) -> bytes:
+    """生成以 %PDF- 开头、%%EOF 结尾的确定性文件内容"""
+    head, tail = b"%PDF-1.7\n", b"\n%%EOF\n"
+    if size <= len(head) + len(tail):
+        return file_body(name, size)
+    return head + file_body(name, size - len(head) - len(tail)) + tail
+
+class _QuietServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        """客户端提前断开连接（如分段下载关闭首个响应）时不打印堆栈"""
+        pass
+
+class StandInServer:
+    """本地模拟 justice.gov 的服务器
+
+    - 数据集列表页 /epstein/doj-disclosures/data-set-N-files?page=K，链接格式与默认正则一致，
+      带分页器，超出末页的页码重复返回末页内容；带 ETag/Last-Modified，支持 304
+    - 索引页 /epstein/doj-disclosures 列出所有数据集
+    - 文件 /epstein/files/DataSet%20N/EFTA########.pdf，支持 Range/If-Range/206/416
+    - 缺少 justiceGovAgeVerified cookie 时返回年龄验证页（HTML）
+    - 可配置 403/429/5xx 比例、响应延迟、限速的慢响应体和被截断的响应体
+    """
+    def __init__(self, file_size: int = 64 * 1024, latency: float = 0.0, host: str = "127.0.0.1", port: int = 0,
+                 data_sets: dict[int, int] | None = None, per_page: int = 50, link_host: str = "https://www.justice.gov",
+                 error_rates: dict[int, float] | None = None, truncate_rate: float = 0.0,
+                 bandwidth: int = 0, require_cookie: bool = True, file_sizes: dict[str, int] | None = None,
+                 seed: int = 0):
+        self.file_size = file_size
+        self.latency = latency
+        self.data_sets = data_sets or {1: 200}
+        self.per_page = per_page
+        self.link_host = link_host
+        self.error_rates = error_rates or {}
+        self.truncate_rate = truncate_rate
+        self.bandwidth = bandwidth
+        self.require_cookie = require_cookie
+        self.file_sizes = file_sizes or {}
+        self.request_count = 0
+        self.counts: Counter = Counter()
+        self.file_bodies: Counter = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.httpd = _QuietServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.httpd.request_queue_size = 1024
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def index_url(self) -> str:
+        return f"{self.base_url}/epstein/doj-disclosures"
+
+    def file_url(self, data_set_number: int, index: int) -> str:
+        return f"{self.base_url}/epstein/files/DataSet%20{data_set_number}/EFTA{index:08d}.pdf"
+
+    def last_page(self, data_set_number: int) -> int:
+        files = self.data_sets.get(data_set_number, 0)
+        return max(0, -(-files // self.per_page) - 1)
+
+    def page_links(self, data_set_number: int, page: int) -> list[str]:
+        """某列表页上的文件链接（使用 link_host，与线上链接格式一致）"""
+        page = min(page, self.last_page(data_set_number))
+        start = page * self.per_page
+        end = min(start + self.per_page, self.data_sets.get(data_set_number, 0))
+        offset = data_set_number * 10_000_000
+        return [f"{self.link_host}/epstein/files/DataSet%20{data_set_number}/EFTA{offset + i:08d}.pdf"
+                for i in range(start, end)]
+
+    def session(self, session: Session) -> Session:
+        """为会话挂载适配器，将 link_host 下的请求转发到本地服务器"""
+        current = session.get_adapter(self.link_host + "/")
+        pool = {"pool_connections": current._pool_connections, "pool_maxsize": current._pool_maxsize,
+                "timeout": current.timeout} if isinstance(current, TransportAdapter) else {}
+        session.mount(self.link_host + "/", _RewriteAdapter(self.link_host, self.base_url, **pool))
+        return session
+
+    def _count(self, kind: str, status: int):
+        with self._lock:
+            self.request_count += 1
+            self.counts[f"{kind} {status}"] += 1
+
+    def _inject_error(self) -> int | None:
+        with self._lock:
+            roll = self._random.random()
+        for status, rate in self.error_rates.items():
+            if roll < rate:
+                return status
+            roll -= rate
+        return None
+
+    def _should_truncate(self) -> bool:
+        if not self.truncate_rate:
+            return False
+        with self._lock:
+            return self._random.random() < self.truncate_rate
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, kind: str, status: int, body: bytes = b"", headers: dict | None = None,
+                      content_type: str = "text/html; charset=utf-8"):
+                server._count(kind, status)
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self._write_body(body)
+
+            def _write_body(self, body: bytes, truncate: bool = False):
+                if truncate:
+                    body = body[:len(body) // 2]
+                if not server.bandwidth:
+                    self.wfile.write(body)
+                else:
+                    step = max(1024, server.bandwidth // 20)
+                    for i in range(0, len(body), step):
+                        self.wfile.write(body[i:i + step])
+                        time.sleep(step / server.bandwidth)
+                if truncate:
+                    self.close_connection = True
+
+            def do_HEAD(self):
+                self.do_GET(head=True)
+
+            def do_GET(self, head: bool = False):
+                if server.latency:
+                    time.sleep(server.latency)
+                parsed = urlparse(self.path)
+                path = parsed.path.rstrip("/") or "/"
+                if server.require_cookie and _AGE_COOKIE not in self.headers.get("Cookie", ""):
+                    return self._send("interstitial", 200, b"" if head else _INTERSTITIAL)
+                error = server._inject_error()
+                if error is not None:
+                    return self._send("error", error, b"", {"Retry-After": "1"} if error == 429 else None)
+                if path == "/epstein/doj-disclosures":
+                    return self._index(head)
+                match = _DATA_SET_RE.match(path)
+                if match:
+                    page = int(parse_qs(parsed.query).get("page", ["0"])[0])
+                    return self._listing(int(match.group(1)), page, head)
+                if _FILE_RE.match(path):
+                    return self._file(path, head)
+                return self._send("not_found", 404)
+
+            def _index(self, head: bool):
+                items = "".join(f'<li><a href="/epstein/doj-disclosures/data-set-{n}-files">Data Set {n}</a></li>'
+                                for n in sorted(server.data_sets))
+                self._send("index", 200, b"" if head else f"<html><body><ul>{items}</ul></body></html>".encode())
+
+            def _listing(self, data_set_number: int, page: int, head: bool):
+                if data_set_number not in server.data_sets:
+                    return self._send("not_found", 404)
+                links = server.page_links(data_set_number, page)
+                etag = '"' + hashlib.sha256("\n".join(links).encode()).hexdigest()[:16] + '"'
+                headers = {"ETag": etag, "Last-Modified": _LAST_MODIFIED}
+                if self.headers.get("If-None-Match") == etag:
+                    return self._send("listing", 304, b"", headers)
+                last = server.last_page(data_set_number)
+                rows = "".join(f'<li><a href="{link}">{link.rsplit("/", 1)[-1]}</a></li>' for link in links)
+                pager = ""
+                if last > 0:
+                    pager = ('<nav class="pager"><ul>'
+                             f'<li class="pager__item"><a href="?page={min(page + 1, last)}">Next</a></li>'
+                             f'<li class="pager__item pager__item--last"><a href="?page={last}">Last</a></li>'
+                             '</ul></nav>')
+                body = f"<html><body><ul>{rows}</ul>{pager}</body></html>".encode()
+                self._send("listing", 200, b"" if head else body, headers)
+
+            def _file(self, path: str, head: bool):
+                size = server.file_sizes.get(path.rsplit("/", 1)[-1], server.file_size)
+                body = pdf_body(path, size)
+                start, end = 0, len(body) - 1
+                status = 200
+                etag = '"' + hashlib.sha256(path.encode()).hexdigest()[:16] + '"'
+                match = _RANGE_RE.fullmatch(self.headers.get("Range", ""))
+                if_range = self.headers.get("If-Range")
+                if match and if_range and if_range not in (etag, _LAST_MODIFIED):
+                    # 校验值不一致时忽略 Range，返回完整文件
+                    match = None
+                if match:
+                    start = int(match.group(1))
+                    if match.group(2):
+                        end = min(end, int(match.group(2)))
+                    if start >= len(body):
+                        return self._send("file", 416, b"", {"Content-Range": f"bytes */{len(body)}"})
+                    status = 206
+                payload = body[start:end + 1]
+                server._count("file", status)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/pdf")
+                self.send_header("Accept-Ranges", "bytes")
+                self.send_header("Content-Length", str(len(payload)))
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", _LAST_MODIFIED)
+                if status == 206:
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{len(body)}")
+                self.end_headers()
+                if not head:
+                    if status == 200:
+                        with server._lock:
+                            server.file_bodies[path] += 1
+                    self._write_body(payload, truncate=server._should_truncate())
+
+        return Handler
+
+    def start(self) -> "StandInServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="stand-in-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+class _RewriteAdapter(TransportAdapter):
+    """将发往线上域名的请求改写到本地模拟服务器"""
+    def __init__(self, remote: str, local: str, **kwargs):
+        super().__init__(**kwargs)
+        self.remote = urlsplit(remote)
+        self.local = urlsplit(local)
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        if parts.netloc == self.remote.netloc:
+            request.url = urlunsplit((self.local.scheme, self.local.netloc, parts.path, parts.query, parts.fragment))
+            request.headers["Host"] = self.local.netloc
+        return super().send(request, **kwargs)
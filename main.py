@@ -1,8 +1,25 @@
 import argparse
+import time
+from pathlib import Path
 from src.config import get_settings
 from src.pages import PageDownloader, check_repeats
-from src.files import FileDownloader
-from src.config import session
+from src.files import FileDownloader, AsyncFileDownloader
+from src.transport import build_session, build_policy
+from src.sync import SyncScheduler
+from src.watch import Watcher
+from src.search import TextIndex, Indexer
+from src.config import LOG_DIR
+from src.metrics import start_exporters, write_summary
+
+def parse_shard(value: str) -> tuple[int, int]:
+    """解析静态分片参数 i/n"""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("分片格式应为 i/n，例如 0/4")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError("分片序号 i 需满足 0 <= i < n")
+    return index, count
 
 def parse_args() -> argparse.Namespace:
     """解析命令行参数"""
@@ -12,26 +29,102 @@ def parse_args() -> argparse.Namespace:
     parser_page = subparsers.add_parser("page", help="根据网页分析其中的下载链接")
     parser_page.add_argument("-s","--start", type=int, default=1, help="起始页码，默认为1",required=True)
     parser_page.add_argument("-e","--end", type=int, help="结束页码，不指定默认使用起始页码",required=False)
+    parser_page.add_argument("--full", action="store_true", help="忽略条件请求缓存，完整重新爬取")
+    parser_page.add_argument("--restart", action="store_true", help="忽略上次中断留下的爬取检查点，从第0页重新爬取")
     
     parser_file = subparsers.add_parser("file", help="下载文件")
     parser_file.add_argument("-s","--start", type=int, default=1, help="起始页码，默认为1",required=True)
     parser_file.add_argument("-e","--end", type=int, help="结束页码，不知道默认使用起始页码",required=False)
     parser_file.add_argument("-r","--retry", action="store_true", help="重试下载失败的文件链接")
+    parser_file.add_argument("--export", action="store_true", help="仅将下载清单导出为 downloads_status.json")
+    parser_file.add_argument("--dedup", action="store_true", help="启用内容寻址去重存储，跨数据集复用已下载文件")
+    parser_file.add_argument("--archive", action="store_true", help="归档输出：每个列表页写入一个未压缩tar分片及偏移索引，不逐个保存文件")
+    parser_file.add_argument("--lease", action="store_true", help="以租约从共享清单认领链接，可在一台或多台机器上同时运行多个进程")
+    parser_file.add_argument("--shard", type=parse_shard, help="静态分片 i/n，仅下载按URL哈希分到第i片的文件")
+    parser_file.add_argument("--engine", choices=["thread", "async"], help="下载引擎，不指定时使用配置 FILE__ENGINE")
+    
+    parser_plan = subparsers.add_parser("plan", help="下载前勘测：HEAD待下载文件获取大小，统计各数据集总大小并检查磁盘空间")
+    parser_plan.add_argument("-s","--start", type=int, default=1, help="起始数据集，默认为1",required=True)
+    parser_plan.add_argument("-e","--end", type=int, help="结束数据集，不指定默认使用起始数据集",required=False)
+    parser_plan.add_argument("--shard", type=parse_shard, help="静态分片 i/n，仅勘测按URL哈希分到第i片的文件")
+    
+    parser_verify = subparsers.add_parser("verify", help="并行校验已下载的文件（PDF文件头、%%%%EOF结尾、大小），问题文件标记为失败以便重新下载")
+    parser_verify.add_argument("-s","--start", type=int, default=1, help="起始数据集，默认为1",required=True)
+    parser_verify.add_argument("-e","--end", type=int, help="结束数据集，不指定默认使用起始数据集",required=False)
+    parser_verify.add_argument("--hash", action="store_true", help="同时计算SHA-256，并与去重存储中的记录比对")
+    parser_verify.add_argument("--workers", type=int, help="校验进程数，不指定时使用配置 FILE__VERIFY_WORKERS（0为CPU核数）")
+    
+    parser_index = subparsers.add_parser("index", help="增量提取已下载PDF的文本，建立SQLite FTS5全文索引")
+    parser_index.add_argument("-s","--start", type=int, default=1, help="起始数据集，默认为1",required=True)
+    parser_index.add_argument("-e","--end", type=int, help="结束数据集，不指定默认使用起始数据集",required=False)
+    parser_index.add_argument("--full", action="store_true", help="忽略已有索引，重新提取全部文件")
+    parser_index.add_argument("--workers", type=int, help="提取文本的进程数，不指定时使用配置 INDEX__WORKERS（0为CPU核数）")
+    
+    parser_search = subparsers.add_parser("search", help="在全文索引中检索")
+    parser_search.add_argument("query", help="检索词，支持FTS5语法（如 \"flight log\"、foo AND bar、prefix*）")
+    parser_search.add_argument("-s","--data-set", type=int, help="只检索某个数据集")
+    parser_search.add_argument("-n","--limit", type=int, default=20, help="返回结果数，默认20")
+    
+    parser_sync = subparsers.add_parser("sync", help="边爬取边下载，多个数据集共用一个全局下载队列与线程池")
+    parser_sync.add_argument("-s","--start", type=int, default=1, help="起始数据集，默认为1",required=True)
+    parser_sync.add_argument("-e","--end", type=int, help="结束数据集，不指定默认使用起始数据集",required=False)
+    parser_sync.add_argument("--full", action="store_true", help="忽略条件请求缓存，完整重新爬取")
+    parser_sync.add_argument("--dedup", action="store_true", help="启用内容寻址去重存储，跨数据集复用已下载文件")
+    parser_sync.add_argument("--shard", type=parse_shard, help="静态分片 i/n，仅下载按URL哈希分到第i片的文件")
+    parser_sync.add_argument("--archive", action="store_true", help="归档输出：每个列表页写入一个未压缩tar分片及偏移索引，不逐个保存文件")
+    
+    parser_watch = subparsers.add_parser("watch", help="常驻轮询索引页与各数据集最新列表页，只下载新增的数据集与链接")
+    parser_watch.add_argument("--interval", type=float, help="轮询间隔（秒），不指定时使用配置 WATCH__INTERVAL")
+    parser_watch.add_argument("--recent-pages", type=int, help="每轮重新请求的最新列表页数，不指定时使用配置 WATCH__RECENT_PAGES")
+    parser_watch.add_argument("--once", action="store_true", help="只轮询一轮后退出")
+    parser_watch.add_argument("--no-download", action="store_true", help="只更新链接，不下载新增文件")
+    parser_watch.add_argument("--dedup", action="store_true", help="启用内容寻址去重存储，跨数据集复用已下载文件")
+    parser_watch.add_argument("--archive", action="store_true", help="归档输出：每个列表页写入一个未压缩tar分片及偏移索引，不逐个保存文件")
     
     args = parser.parse_args()
     return args
 
+# 指标导出与运行汇总描述的是爬取与下载，只对这些命令启用
+METERED_COMMANDS = ("page", "file", "sync", "watch")
+
 def main():
     settings = get_settings()
     args = parse_args()
     
+    if args.command not in METERED_COMMANDS:
+        run_command(args, settings)
+        return
+    exporters = start_exporters(settings.METRICS.port, settings.METRICS.snapshot_path, settings.METRICS.snapshot_interval)
+    try:
+        run_command(args, settings)
+    finally:
+        for exporter in exporters:
+            exporter.stop()
+        if settings.METRICS.summary:
+            summary = write_summary(LOG_DIR / f"run_summary_{args.command}.json")
+            print(f"运行汇总: 耗时 {summary['elapsed_seconds']}s, 下载 {summary['downloads']}, "
+                  f"{summary['bytes_per_second'] / 1024 / 1024:.2f} MB/s, 重试 {summary['retries']}")
+
+def run_command(args: argparse.Namespace, settings):
+    """执行子命令"""
+    retry_policy = build_policy(settings.HTTP)
+    # 连接池按并发数配置：页面爬取线程数，文件下载线程数 × 分段连接数
+    page_pool = settings.PAGE.max_workers
+    file_pool = settings.FILE.max_workers * max(1, settings.FILE.segment_count)
     if args.command == "page":
         if args.end is None:
             args.end = args.start
         
+        session = build_session(page_pool, settings.HTTP)
+        page_kwargs = settings.PAGE.model_dump()
+        page_kwargs["retry_policy"] = retry_policy
+        if args.full:
+            page_kwargs["incremental"] = False
+        if args.restart:
+            page_kwargs["resume"] = False
         for data_set_number in range(args.start, args.end + 1):
             downloader = PageDownloader(session=session, 
-                                        **settings.PAGE.model_dump())
+                                        **page_kwargs)
             downloader.download_original_webpage(data_set_number)
             check_repeats(data_set_number)
     
@@ -39,17 +132,128 @@ def main():
         if args.end is None:
             args.end = args.start
         
+        engine = args.engine or settings.FILE.engine
+        downloader_cls = AsyncFileDownloader if engine == "async" else FileDownloader
+        session = build_session(file_pool, settings.HTTP)
+        file_kwargs = settings.FILE.model_dump()
+        file_kwargs["retry_policy"] = retry_policy
+        if args.dedup:
+            file_kwargs["dedup"] = True
+        if args.archive:
+            file_kwargs["output"] = "archive"
+        if args.shard:
+            file_kwargs["shard"] = args.shard
+        if args.lease:
+            file_kwargs["lease"] = True
         for data_set_number in range(args.start, args.end + 1):
-            downloader = FileDownloader(session=session,
+            downloader = downloader_cls(session=session,
                                         page_dir=settings.PAGE.dir_path,
-                                        **settings.FILE.model_dump()
+                                        **file_kwargs
                                         )
-            if args.retry:
+            if args.export:
+                downloader.migrate_status_json(data_set_number)
+                downloader.write_status_json(data_set_number)
+            elif args.retry:
                 downloader.retry_failed_downloads(data_set_number=data_set_number)
             else:
                 downloader.start_download(data_set_number=data_set_number)
-
-        
+    
+    if args.command == "plan":
+        if args.end is None:
+            args.end = args.start
+        session = build_session(settings.FILE.plan_workers, settings.HTTP)
+        file_kwargs = settings.FILE.model_dump()
+        file_kwargs["retry_policy"] = retry_policy
+        if args.shard:
+            file_kwargs["shard"] = args.shard
+        downloader = FileDownloader(session=session, page_dir=settings.PAGE.dir_path, **file_kwargs)
+        summaries = [summary for data_set_number in range(args.start, args.end + 1)
+                     if (summary := downloader.plan(data_set_number)) is not None]
+        for summary in summaries:
+            print(f"数据集 {summary['data_set']}: {summary['files']} 个待下载文件（{summary['unknown']} 个未获取到大小），"
+                  f"共 {summary['total_bytes'] / 1024 ** 3:.2f} GB，剩余 {summary['remaining_bytes'] / 1024 ** 3:.2f} GB，"
+                  f"最大文件 {summary['largest_bytes'] / 1024 ** 2:.1f} MB")
+        if summaries:
+            remaining = sum(summary["remaining_bytes"] for summary in summaries)
+            free = summaries[-1]["free_bytes"]
+            print(f"合计剩余 {remaining / 1024 ** 3:.2f} GB，磁盘可用 {free / 1024 ** 3:.2f} GB"
+                  + ("" if remaining <= free else f"，空间不足 {(remaining - free) / 1024 ** 3:.2f} GB"))
+    
+    if args.command == "verify":
+        if args.end is None:
+            args.end = args.start
+        file_kwargs = settings.FILE.model_dump()
+        downloader = FileDownloader(session=build_session(1, settings.HTTP), page_dir=settings.PAGE.dir_path, **file_kwargs)
+        workers = args.workers if args.workers is not None else settings.FILE.verify_workers
+        for data_set_number in range(args.start, args.end + 1):
+            summary = downloader.verify(data_set_number, want_hash=args.hash, max_workers=workers or None)
+            print(f"数据集 {data_set_number}: 校验 {summary['checked']} 个文件，通过 {summary['ok']}，"
+                  f"问题 {summary['bad']} {summary['reasons'] or ''}，用时 {summary['seconds']}s")
+    
+    if args.command in ("index", "search"):
+        db_path = Path(settings.INDEX.db_path) if settings.INDEX.db_path else Path(settings.FILE.dir_path) / "search.sqlite3"
+        index = TextIndex(db_path)
+        try:
+            if args.command == "index":
+                if args.end is None:
+                    args.end = args.start
+                workers = args.workers if args.workers is not None else settings.INDEX.workers
+                indexer = Indexer(settings.FILE.dir_path, settings.PAGE.dir_path, index, max_workers=workers or None)
+                for data_set_number in range(args.start, args.end + 1):
+                    summary = indexer.run(data_set_number, full=args.full)
+                    if summary is not None:
+                        print(f"数据集 {data_set_number}: {summary['files']} 个文件，新提取 {summary['indexed']}"
+                              f"（失败 {summary['failed']}），未变化 {summary['unchanged']}，移除 {summary['removed']}，"
+                              f"用时 {summary['seconds']}s")
+            else:
+                begin = time.perf_counter()
+                results = index.search(args.query, limit=args.limit, data_set=args.data_set)
+                elapsed = (time.perf_counter() - begin) * 1000
+                for result in results:
+                    print(f"[数据集 {result['data_set']} 第 {result['page']} 页] {result['name']}  {result['url']}")
+                    print(f"    {' '.join(result['snippet'].split())}")
+                print(f"共 {len(results)} 条结果，用时 {elapsed:.1f} ms")
+        finally:
+            index.close()
+    
+    if args.command == "sync":
+        if args.end is None:
+            args.end = args.start
+        session = build_session(page_pool + file_pool, settings.HTTP)
+        page_kwargs = settings.PAGE.model_dump()
+        page_kwargs["retry_policy"] = retry_policy
+        if args.full:
+            page_kwargs["incremental"] = False
+        file_kwargs = settings.FILE.model_dump()
+        file_kwargs["retry_policy"] = retry_policy
+        if args.dedup:
+            file_kwargs["dedup"] = True
+        if args.archive:
+            file_kwargs["output"] = "archive"
+        if args.shard:
+            file_kwargs["shard"] = args.shard
+        downloader = FileDownloader(session=session, page_dir=settings.PAGE.dir_path, **file_kwargs)
+        scheduler = SyncScheduler(session, downloader, page_kwargs)
+        scheduler.run(list(range(args.start, args.end + 1)))
+    
+    if args.command == "watch":
+        # 会话在整个常驻期间复用，连接池同时服务爬取与下载
+        session = build_session(page_pool + file_pool, settings.HTTP)
+        page_kwargs = settings.PAGE.model_dump()
+        page_kwargs["retry_policy"] = retry_policy
+        downloader = None
+        if settings.WATCH.download and not args.no_download:
+            file_kwargs = settings.FILE.model_dump()
+            file_kwargs["retry_policy"] = retry_policy
+            if args.dedup:
+                file_kwargs["dedup"] = True
+            if args.archive:
+                file_kwargs["output"] = "archive"
+            downloader = FileDownloader(session=session, page_dir=settings.PAGE.dir_path, **file_kwargs)
+        watcher = Watcher(session, downloader, page_kwargs,
+                          interval=args.interval or settings.WATCH.interval,
+                          recent_pages=args.recent_pages or settings.WATCH.recent_pages)
+        watcher.run(once=args.once)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,3 +1,4 @@
+from typing import Literal
 from pydantic import BaseModel, Field, field_validator
 from pydantic_settings import BaseSettings,SettingsConfigDict
 from .consts import BASE_DIR, PAGE_DIR, FILE_DIR
@@ -24,6 +25,11 @@ class PageConfig(BaseModel):
             return PAGE_DIR.as_posix()
     max_retry_times: int = 7
     max_repeat_pages: int = 5
+    pager_pattern: str|None = r'href="[^"]*[?&;]page=(\d+)[^"]*"'
+    max_workers: int = 4
+    rate_limit: float = 3.0
+    incremental: bool = True
+    resume: bool = True
     
 class FileConfig(BaseModel):
     dir_path: str = "files"
@@ -34,12 +40,65 @@ class FileConfig(BaseModel):
             return get_absolute_dir(path)
         except:
             return FILE_DIR.as_posix()
-    max_worker: int = 6
+    max_workers: int = 6
+    min_workers: int = 2
+    adaptive: bool = True
     max_retry_times: int = 3
+    engine: Literal["thread", "async"] = "thread"
+    max_connections: int = 200
+    max_per_host: int = 50
+    dedup: bool = False
+    segment_threshold: int = 64 * 1024 * 1024
+    segment_count: int = 4
+    output: Literal["files", "archive"] = "files"
+    lease: bool = False
+    lease_seconds: float = 300.0
+    lease_batch: int = 50
+    manifest_wal: bool = True
+    plan_workers: int = 16
+    plan_rate_limit: float = 20.0
+    verify_workers: int = 0
+
+class TransportConfig(BaseModel):
+    pool_connections: int = 4
+    pool_maxsize: int = 0
+    connect_timeout: float = 10.0
+    read_timeout: float = 20.0
+    backoff_base: float = 2.0
+    backoff_cap: float = 60.0
+    backoff_jitter: float = 0.3
+    http2: bool = False
+
+class MetricsConfig(BaseModel):
+    port: int = 0
+    snapshot_path: str|None = None
+    @field_validator("snapshot_path", mode="before")
+    def validate_path(cls, path):
+        """相对路径解析为相对根目录的绝对路径"""
+        return get_absolute_dir(path) if path else None
+    snapshot_interval: float = 10.0
+    summary: bool = True
+
+class WatchConfig(BaseModel):
+    interval: float = 3600.0
+    recent_pages: int = 2
+    download: bool = True
+
+class IndexConfig(BaseModel):
+    db_path: str|None = None
+    @field_validator("db_path", mode="before")
+    def validate_path(cls, path):
+        """相对路径解析为相对根目录的绝对路径，不设置时位于下载目录下的 search.sqlite3"""
+        return get_absolute_dir(path) if path else None
+    workers: int = 0
 
 class MySettings(BaseSettings):
     PAGE: PageConfig = Field(default_factory=PageConfig)
     FILE: FileConfig = Field(default_factory=FileConfig)
+    METRICS: MetricsConfig = Field(default_factory=MetricsConfig)
+    HTTP: TransportConfig = Field(default_factory=TransportConfig)
+    WATCH: WatchConfig = Field(default_factory=WatchConfig)
+    INDEX: IndexConfig = Field(default_factory=IndexConfig)
     
 class Settings(MySettings):
     model_config = SettingsConfigDict(
@@ -3,11 +3,13 @@ from datetime import datetime
 from pathlib import Path
 
 def init_logger(name: str,log_file: str|Path,level=logging.INFO) -> logging.Logger:
-    """初始化日志记录器"""
+    """初始化日志记录器，同名记录器每个进程只配置一次，重复调用直接返回"""
+    logger = logging.getLogger(name)
+    if getattr(logger, "_initialized", False):
+        return logger
     Path(log_file).parent.mkdir(parents=True, exist_ok=True)
     with open(log_file, 'a') as f:
         f.write(f"================================{{{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}}}================================\n")
-    logger = logging.getLogger(name)
     logger.setLevel(level)
 
     fh = logging.FileHandler(log_file, mode='a',encoding='utf-8')
@@ -22,4 +24,5 @@ def init_logger(name: str,log_file: str|Path,level=logging.INFO) -> logging.Logg
 
     logger.addHandler(fh)
     logger.addHandler(ch)
+    logger._initialized = True
     return logger
\ No newline at end of file
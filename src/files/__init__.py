@@ -1,3 +1,5 @@
 from .filedownloader import FileDownloader
+from .asyncdownloader import AsyncFileDownloader
+from .manifest import DownloadManifest
 
-__all__ = ["FileDownloader"]
\ No newline at end of file
+__all__ = ["FileDownloader", "AsyncFileDownloader", "DownloadManifest"]
\ No newline at end of file
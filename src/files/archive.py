@@ -0,0 +1,132 @@
+import json
+import shutil
+import tarfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows 无 fcntl，只做进程内加锁
+    fcntl = None
+
+_BLOCK = 512
+_END_OF_ARCHIVE = b"\0" * (2 * _BLOCK)
+
+def shard_path(output_dir: Path) -> Path:
+    """列表页对应的归档分片：page_N/ 目录改为同级的 page_N.tar"""
+    return output_dir.with_name(output_dir.name + ".tar")
+
+class ArchiveShard:
+    """未压缩的tar分片，旁路索引 <分片>.idx.json 记录每个成员的数据偏移与大小，可按偏移随机读取单个文件。
+    索引是权威记录：追加前先截断到索引记录的末尾，进程中断时写了一半的成员会被覆盖"""
+    def __init__(self, path: str|Path):
+        self.path = Path(path)
+        self.index_path = self.path.with_name(self.path.name + ".idx.json")
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self._lock = threading.Lock()
+        self.index = self._load_index()
+
+    def _load_index(self) -> dict:
+        """读取索引，丢弃超出分片实际大小的成员"""
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {"end": 0, "members": {}}
+        actual = self.path.stat().st_size if self.path.exists() else 0
+        if index.get("end", 0) > actual:
+            members = {name: member for name, member in index.get("members", {}).items()
+                       if member["offset"] + member["size"] <= actual}
+            end = max((member["offset"] + member["size"] + (-member["size"]) % _BLOCK for member in members.values()),
+                      default=0)
+            index = {"end": end, "members": members}
+        return index
+
+    def _save_index(self):
+        tmp = self.index_path.with_name(self.index_path.name + ".tmp")
+        tmp.write_text(json.dumps(self.index), encoding="utf-8")
+        tmp.replace(self.index_path)
+
+    @contextmanager
+    def _locked(self):
+        """进程内与跨进程（flock）互斥，多个下载进程可共用同一分片"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def contains(self, name: str) -> bool:
+        return name in self.index["members"]
+
+    def size(self, name: str) -> int | None:
+        member = self.index["members"].get(name)
+        return member["size"] if member else None
+
+    def members(self) -> dict[str, dict]:
+        """{成员名: {"offset", "size", "url"}}"""
+        return dict(self.index["members"])
+
+    def add(self, name: str, src: Path, url: str):
+        """将文件作为新成员追加到分片末尾并更新索引，已存在同名成员时跳过"""
+        size = src.stat().st_size
+        info = tarfile.TarInfo(name)
+        info.size = size
+        info.mtime = int(time.time())
+        info.mode = 0o644
+        header = info.tobuf(format=tarfile.PAX_FORMAT)
+        with self._locked():
+            # 其他进程可能已追加成员，加锁后重新读取索引
+            self.index = self._load_index()
+            if name in self.index["members"]:
+                return
+            end = self.index["end"]
+            with open(self.path, "r+b" if self.path.exists() else "wb") as f:
+                f.truncate(end)
+                f.seek(end)
+                f.write(header)
+                offset = end + len(header)
+                with open(src, "rb") as fsrc:
+                    shutil.copyfileobj(fsrc, f, 1024 * 1024)
+                f.write(b"\0" * ((-size) % _BLOCK))
+                new_end = f.tell()
+                f.write(_END_OF_ARCHIVE)
+            self.index["members"][name] = {"offset": offset, "size": size, "url": url}
+            self.index["end"] = new_end
+            self._save_index()
+
+    def discard(self, name: str):
+        """从索引中移除成员（如校验不通过需重新下载），数据仍留在分片中，重新下载后追加为新成员"""
+        with self._locked():
+            self.index = self._load_index()
+            if self.index["members"].pop(name, None) is not None:
+                self._save_index()
+
+    def read(self, name: str) -> bytes:
+        """按索引中的偏移随机读取单个成员，无需解包"""
+        member = self.index["members"][name]
+        with open(self.path, "rb") as f:
+            f.seek(member["offset"])
+            return f.read(member["size"])
+
+    def extract(self, name: str, dest: Path):
+        """将单个成员写出为文件"""
+        member = self.index["members"][name]
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "rb") as fsrc, open(dest, "wb") as fdst:
+            fsrc.seek(member["offset"])
+            remaining = member["size"]
+            while remaining > 0:
+                chunk = fsrc.read(min(remaining, 1024 * 1024))
+                if not chunk:
+                    raise IOError(f"分片 {self.path} 中的 {name} 不完整")
+                fdst.write(chunk)
+                remaining -= len(chunk)
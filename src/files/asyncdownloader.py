@@ -0,0 +1,186 @@
+import asyncio
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Iterator
+from requests import Session
+from src.metrics import metrics
+from .filedownloader import FileDownloader, PartWriter
+from .partfile import PartFile
+
+try:
+    import aiohttp
+except ImportError:  # 可选依赖，仅 async 引擎需要
+    aiohttp = None
+
+_DONE = object()
+
+class AsyncFileDownloader(FileDownloader):
+    """基于 asyncio + aiohttp 的下载引擎，单事件循环内并发数百个流式下载"""
+    # 分段下载仍在线程中使用 requests，两类异常都要归类
+    SHORT_READ_ERRORS = FileDownloader.SHORT_READ_ERRORS + ((aiohttp.ClientPayloadError,) if aiohttp else ())
+    TIMEOUT_ERRORS = FileDownloader.TIMEOUT_ERRORS + (asyncio.TimeoutError,)
+    CONNECTION_ERRORS = FileDownloader.CONNECTION_ERRORS + ((aiohttp.ClientConnectionError,) if aiohttp else ())
+
+    def __init__(self, session: Session, dir_path: str|Path, max_connections: int = 200, max_per_host: int = 50, **kwargs):
+        if aiohttp is None:
+            raise ImportError("async 下载引擎需要 aiohttp，请先执行 pip install aiohttp")
+        super().__init__(session, dir_path, **kwargs)
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self.concurrency = self.new_concurrency(max_connections)
+
+    def _client_session(self) -> "aiohttp.ClientSession":
+        """根据 requests 会话的请求头与cookie构造 aiohttp 会话"""
+        connector = aiohttp.TCPConnector(limit=self.max_connections, limit_per_host=self.max_per_host)
+        # 与 requests 会话的传输层使用相同的 (连接, 读取) 超时
+        connect_timeout, read_timeout = getattr(self.session.get_adapter("https://"), "timeout", None) or (20, 20)
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=connect_timeout, sock_read=read_timeout)
+        return aiohttp.ClientSession(connector=connector,
+                                     timeout=timeout,
+                                     headers=dict(self.session.headers),
+                                     cookies=self.session.cookies.get_dict())
+
+    def http_status(self, e: Exception) -> tuple[int, dict] | None:
+        if isinstance(e, aiohttp.ClientResponseError):
+            return e.status, e.headers or {}
+        return super().http_status(e)
+
+    async def commit_async(self, commit, *args):
+        """在线程中提交下载：去重模式要计算整个文件的SHA-256（分段下载没有流式哈希）或复制进存储，
+        归档模式要复制进分片并等待分片文件锁，都不能阻塞事件循环中的其他下载"""
+        await asyncio.to_thread(commit, *args)
+
+    async def fetch_file_async(self, client: "aiohttp.ClientSession", url: str, file_path: Path) -> tuple[int, float]:
+        """单次下载尝试（fetch_file 的 asyncio 版本），响应处理、续传与提交流程与线程池引擎共用"""
+        started = time.monotonic()
+        part = PartFile(url, file_path)
+        segmented_total = self.segmented_size(part.path)
+        if segmented_total:
+            await asyncio.to_thread(self.download_segmented, url, part.path, segmented_total)
+            await self.commit_async(self.commit_part, part)
+            return segmented_total, time.monotonic() - started
+
+        existing_size = part.offset
+        async with client.get(url, headers=part.resume_headers()) as resp:
+            latency = time.monotonic() - started
+            action, expected, append = self.begin_response(part, existing_size, resp.status, resp.headers,
+                                                           resp.raise_for_status)
+            if action == "stream":
+                if append:
+                    # 续传时哈希要先读一遍已下载的部分
+                    hasher = await asyncio.to_thread(self.new_hasher, part.path, append)
+                else:
+                    hasher = self.new_hasher(part.path, append)
+                with PartWriter(part, append, hasher) as writer:
+                    async for chunk in resp.content.iter_chunked(1024 * 256):
+                        writer.write(chunk)
+        if action == "satisfied":
+            await self.commit_async(self.finish_satisfied_part, part)
+            return 0, latency
+        if action == "segment":
+            # 大文件交给线程中的分段下载，不阻塞事件循环
+            await asyncio.to_thread(self.download_segmented, url, part.path, expected)
+            await self.commit_async(self.commit_part, part)
+            return expected, latency
+        await self.commit_async(self.commit_part, part, hasher)
+        return writer.bytes_written, latency
+
+    async def download_file_async(self, client: "aiohttp.ClientSession", url: str, file_path: Path, max_retry_times: int = 3) -> tuple[str, str, str]:
+        """异步下载单个文件，与 download_file 相同的 .part 断点续传和重试逻辑"""
+        reason_list: list[str] = []
+        for retry_time in range(1, max_retry_times + 1):
+            metrics.add("downloads_active", 1)
+            try:
+                nbytes, latency = await self.fetch_file_async(client, url, file_path)
+            except Exception as e:
+                delay = self.on_attempt_failed(url, file_path, e, retry_time, max_retry_times, reason_list)
+            else:
+                self.record_success_metrics(latency, nbytes)
+                return url, "success", ""
+            finally:
+                metrics.add("downloads_active", -1)
+            if retry_time < max_retry_times:
+                await asyncio.sleep(delay)
+        return self.on_download_failed(url, max_retry_times, reason_list)
+
+    async def _run_all(self, tasks: Iterable[tuple[str, str, Path]], results: queue.Queue):
+        """在事件循环中以固定数量的 worker 协程消费任务；tasks 为迭代器时由 feed 协程在队列不足一轮并发时
+        在线程中取下一个任务（可能需要认领租约、查询清单），不阻塞事件循环"""
+        pending: asyncio.Queue = asyncio.Queue()
+        exhausted = False
+
+        async def feed():
+            nonlocal exhausted
+            if isinstance(tasks, list):
+                for task in tasks:
+                    pending.put_nowait(task)
+            else:
+                source = iter(tasks)
+                while True:
+                    while pending.qsize() >= self.max_connections:
+                        await asyncio.sleep(0.1)
+                    task = await asyncio.to_thread(next, source, None)
+                    if task is None:
+                        break
+                    pending.put_nowait(task)
+            # 结束标记排在所有任务之后，取到它的 worker 放回后退出
+            exhausted = True
+            pending.put_nowait(_DONE)
+
+        async def worker(client, index: int):
+            while True:
+                # 序号不低于当前并发上限或处于全局暂停期的 worker 暂不取任务；队列中只剩结束标记时退出
+                while index >= self.concurrency.current_limit or self.concurrency.paused_for() > 0:
+                    if exhausted and pending.qsize() <= 1:
+                        return
+                    await asyncio.sleep(max(0.2, self.concurrency.paused_for()))
+                task = await pending.get()
+                if task is _DONE:
+                    pending.put_nowait(_DONE)
+                    return
+                output_key, link, file_path = task
+                metrics.set("queue_depth", pending.qsize())
+                url, status, reason = await self.download_file_async(client, link, file_path, self.max_retry_times)
+                results.put((output_key, url, status, reason))
+
+        async with self._client_session() as client:
+            workers = min(self.max_connections, len(tasks)) if isinstance(tasks, list) else self.max_connections
+            await asyncio.gather(feed(), *(worker(client, index) for index in range(workers)))
+
+    def run_tasks(self, tasks: Iterable[tuple[str, str, Path]]) -> Iterator[tuple[str, str, str, str]]:
+        """执行下载任务（asyncio 后端），事件循环在后台线程运行，按完成顺序产出结果；
+        tasks 可以是边认领边产出的迭代器，整个运行只用一个事件循环和一个 aiohttp 会话"""
+        results: queue.Queue = queue.Queue()
+        errors: list[Exception] = []
+        loop = asyncio.new_event_loop()
+        main_task = loop.create_task(self._run_all(tasks, results))
+
+        def loop_thread():
+            try:
+                loop.run_until_complete(main_task)
+            except asyncio.CancelledError:
+                self.logger.warning("异步下载已取消。")
+            except Exception as e:
+                self.logger.error(f"异步下载引擎异常退出: {e}")
+                errors.append(e)
+            finally:
+                loop.close()
+                results.put(_DONE)
+
+        thread = threading.Thread(target=loop_thread, name="async-downloader", daemon=True)
+        thread.start()
+        try:
+            while (item := results.get()) is not _DONE:
+                yield item
+        finally:
+            if thread.is_alive():
+                try:
+                    loop.call_soon_threadsafe(main_task.cancel)
+                except RuntimeError:
+                    pass
+            thread.join()
+        # 任务来源（如认领租约）出错时与线程池引擎一样抛给调用方
+        if errors:
+            raise errors[0]
@@ -0,0 +1,83 @@
+import hashlib
+import os
+import shutil
+from pathlib import Path
+from .manifest import DownloadManifest
+
+try:
+    import fcntl
+except ImportError:  # Windows 无 fcntl，不支持 reflink
+    fcntl = None
+
+_FICLONE = 0x40049409
+
+def sha256_file(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """计算文件的SHA-256"""
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+def _reflink(src: Path, dst: Path) -> bool:
+    """尝试写时复制克隆(btrfs/xfs)，不支持时返回False"""
+    if fcntl is None:
+        return False
+    try:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+        return True
+    except OSError:
+        dst.unlink(missing_ok=True)
+        return False
+
+def link_or_copy(src: Path, dst: Path):
+    """依次尝试硬链接、reflink，都不支持时复制"""
+    try:
+        os.link(src, dst)
+        return
+    except OSError:
+        pass
+    if not _reflink(src, dst):
+        shutil.copyfile(src, dst)
+
+class BlobStore:
+    """内容寻址存储：文件按SHA-256保存一份，各 page_N 目录中以硬链接引用，URL→blob 索引跨数据集共享"""
+    def __init__(self, root: str|Path, manifest: DownloadManifest):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.manifest = manifest
+
+    def blob_path(self, sha256: str) -> Path:
+        return self.root / sha256[:2] / sha256[2:4] / sha256
+
+    def lookup(self, url: str) -> tuple[str, int] | None:
+        """查询URL对应的blob，blob文件不存在时视为未命中"""
+        hit = self.manifest.blob_for_url(url)
+        if hit and self.blob_path(hit[0]).exists():
+            return hit
+        return None
+
+    def link_into(self, sha256: str, dest: Path):
+        """将blob链接到目标路径，替换已有文件"""
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(dest.name + ".linktmp")
+        tmp.unlink(missing_ok=True)
+        link_or_copy(self.blob_path(sha256), tmp)
+        os.replace(tmp, dest)
+
+    def adopt(self, url: str, file_path: Path, sha256: str | None = None) -> str:
+        """将下载完成的文件纳入存储：内容已存在时改为链接到已有blob，否则将文件链接进存储"""
+        sha256 = sha256 or sha256_file(file_path)
+        blob = self.blob_path(sha256)
+        if blob.exists():
+            if not os.path.samefile(blob, file_path):
+                self.link_into(sha256, file_path)
+        else:
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            tmp = blob.with_name(blob.name + ".tmp")
+            tmp.unlink(missing_ok=True)
+            link_or_copy(file_path, tmp)
+            os.replace(tmp, blob)
+        self.manifest.record_blob(url, sha256, blob.stat().st_size)
+        return sha256
@@ -0,0 +1,91 @@
+import threading
+import time
+
+class AdaptiveConcurrency:
+    """AIMD 并发控制器：吞吐上升且延迟未恶化时增加在途下载数（首次限流前按倍数慢启动，之后加性增加），
+    遇到限流/超时时乘性减少，服务器要求等待或已降到下限时全局暂停"""
+    def __init__(self, floor: int = 2, ceiling: int = 6, initial: int | None = None,
+                 decrease_factor: float = 0.5, latency_tolerance: float = 2.0,
+                 cooldown: float = 2.0, max_pause: float = 60.0):
+        self.floor = max(1, floor)
+        self.ceiling = max(self.floor, ceiling)
+        self.limit = float(min(self.ceiling, max(self.floor, initial or self.floor)))
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.cooldown = cooldown
+        self.max_pause = max_pause
+        self.in_flight = 0
+        self._cond = threading.Condition()
+        self._pause_until = 0.0
+        self._last_decrease = 0.0
+        self._min_latency: float | None = None
+        self._window_start = time.monotonic()
+        self._window_bytes = 0
+        self._window_count = 0
+        self._window_latency = 0.0
+        self._last_throughput = 0.0
+        self._slow_start = True
+
+    @property
+    def current_limit(self) -> int:
+        return int(self.limit)
+
+    def paused_for(self) -> float:
+        """距离全局暂停结束的秒数"""
+        return max(0.0, self._pause_until - time.monotonic())
+
+    def acquire(self):
+        """阻塞直到在途数低于当前上限且不处于暂停期"""
+        with self._cond:
+            while True:
+                pause = self.paused_for()
+                if pause > 0:
+                    self._cond.wait(pause)
+                elif self.in_flight >= int(self.limit):
+                    self._cond.wait(1.0)
+                else:
+                    self.in_flight += 1
+                    return
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify()
+
+    def on_success(self, latency: float, nbytes: int):
+        """记录一次成功下载；每个窗口（约等于当前上限次完成）评估一次是否加性增加"""
+        with self._cond:
+            self._min_latency = latency if self._min_latency is None else min(self._min_latency, latency)
+            self._window_bytes += nbytes
+            self._window_count += 1
+            self._window_latency += latency
+            if self._window_count < max(4, int(self.limit)):
+                return
+            elapsed = max(time.monotonic() - self._window_start, 1e-6)
+            throughput = self._window_bytes / elapsed
+            avg_latency = self._window_latency / self._window_count
+            latency_ok = avg_latency <= self._min_latency * self.latency_tolerance
+            if latency_ok and throughput >= self._last_throughput * 0.95 and self.limit < self.ceiling:
+                self.limit = min(self.ceiling, self.limit * 2 if self._slow_start else self.limit + 1)
+                self._cond.notify_all()
+            self._last_throughput = throughput
+            self._window_start = time.monotonic()
+            self._window_bytes = self._window_count = 0
+            self._window_latency = 0.0
+
+    def on_throttle(self, delay: float, retry_after: float | None = None) -> bool:
+        """遇到403/429/5xx或超时：乘性减少上限（冷却期内只减一次）。只有服务器给出 Retry-After，
+        或上限已经降到下限、无法再减时，才让所有下载全局暂停并返回True；否则返回False，由失败的任务按 delay 自行退避"""
+        with self._cond:
+            now = time.monotonic()
+            at_floor = self.limit <= self.floor
+            if now - self._last_decrease >= self.cooldown:
+                self.limit = max(float(self.floor), self.limit * self.decrease_factor)
+                self._last_decrease = now
+                self._slow_start = False
+                self._last_throughput = 0.0
+            if retry_after is None and not at_floor:
+                return False
+            pause = retry_after if retry_after is not None else delay
+            self._pause_until = max(self._pause_until, now + min(pause, self.max_pause))
+            return True
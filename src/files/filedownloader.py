@@ -1,172 +1,705 @@
-import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from requests.exceptions import HTTPError
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from requests.exceptions import HTTPError, Timeout, RetryError, ChunkedEncodingError, ConnectionError as RequestsConnectionError
 from requests import Session
 from src.config import LOG_DIR, BASE_DIR, init_logger
+from src.metrics import metrics
+from src.transport import RetryPolicy, parse_retry_after
+from src.pages import iter_data_set_links
+from .manifest import DownloadManifest, shard_of
+from .blobstore import BlobStore
+from .segmented import SegmentedDownload, IncompleteDownloadError, segment_state_path, remaining_segment_bytes
+from .concurrency import AdaptiveConcurrency
+from .partfile import PartFile, part_path, part_state_path
+from .archive import ArchiveShard, shard_path
+from .planner import SizeSurvey, largest_first, free_space
+from .verify import verify_files, is_pdf
+import hashlib
 import json
+import os
+import socket
+import threading
 from pathlib import Path
 import time
+from typing import Iterable, Iterator, Sized
+
+THROTTLE_STATUS = (403, 429)
+
+class PartWriter:
+    """将响应体逐块写入 .part：累计字节数、定期保存进度并同步更新去重哈希，两种下载引擎共用"""
+    def __init__(self, part: PartFile, append: bool, hasher=None):
+        self.part = part
+        self.hasher = hasher
+        self.bytes_written = 0
+        self._file = open(part.path, "ab" if append else "wb")
+
+    def write(self, chunk: bytes):
+        if not chunk:
+            return
+        self._file.write(chunk)
+        self.bytes_written += len(chunk)
+        self.part.advance(len(chunk), self._file)
+        if self.hasher:
+            self.hasher.update(chunk)
+
+    def __enter__(self) -> "PartWriter":
+        return self
+
+    def __exit__(self, *exc):
+        self._file.close()
+        self.part.save()
 
 class FileDownloader():
-    def __init__(self, session: Session, dir_path:str|Path, max_workers: int = 6, max_retry_times: int = 3, page_dir:str|Path = None, **kwargs):
+    # classify_error 按这些异常类型归类，异步引擎补充 aiohttp/asyncio 的对应类型
+    SHORT_READ_ERRORS: tuple[type[BaseException], ...] = (IncompleteDownloadError, ChunkedEncodingError)
+    TIMEOUT_ERRORS: tuple[type[BaseException], ...] = (Timeout,)
+    CONNECTION_ERRORS: tuple[type[BaseException], ...] = (RequestsConnectionError, RetryError)
+
+    def __init__(self, session: Session, dir_path:str|Path, max_workers: int = 6, max_retry_times: int = 3, page_dir:str|Path = None, dedup: bool = False,
+                 segment_threshold: int = 64 * 1024 * 1024, segment_count: int = 4,
+                 min_workers: int = 2, adaptive: bool = True, output: str = "files",
+                 lease: bool = False, lease_seconds: float = 300.0, lease_batch: int = 50, manifest_wal: bool = True,
+                 shard: tuple[int, int] | None = None, retry_policy: RetryPolicy | None = None,
+                 plan_workers: int = 16, plan_rate_limit: float = 20.0, **kwargs):
         self.session = session
         self.max_workers = max_workers
+        self.min_workers = min_workers
+        self.adaptive = adaptive
+        self.concurrency = self.new_concurrency(max_workers)
         self.max_retry_times = max_retry_times
+        self.retry_policy = retry_policy or RetryPolicy()
         self.logger = init_logger('downloader', LOG_DIR / 'file_download.log')
         self.file_dir = Path(dir_path)
         self.file_dir.mkdir(parents=True, exist_ok=True)
         self.page_dir = Path(page_dir) if page_dir else None
-        
+        self.manifest = DownloadManifest(self.file_dir / "manifest.sqlite3", wal=manifest_wal)
+        self.lease = lease
+        self.lease_seconds = lease_seconds
+        self.lease_batch = lease_batch
+        self.shard = shard
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}"
+        self.archive = output == "archive"
+        if self.archive and dedup:
+            self.logger.warning("归档输出模式不支持去重存储，已关闭去重。")
+            dedup = False
+        self.blob_store = BlobStore(self.file_dir / ".blobs", self.manifest) if dedup else None
+        self.shards: dict[Path, ArchiveShard] = {}
+        self.staged: dict[Path, tuple[ArchiveShard, str]] = {}
+        self._shards_lock = threading.Lock()
+        self.segment_threshold = segment_threshold
+        self.segment_count = segment_count
+        self.plan_workers = plan_workers
+        self.plan_rate_limit = plan_rate_limit
+
+    def new_concurrency(self, ceiling: int) -> AdaptiveConcurrency:
+        """创建并发控制器，关闭自适应时上下限都固定为ceiling"""
+        floor = min(self.min_workers, ceiling) if self.adaptive else ceiling
+        return AdaptiveConcurrency(floor=floor, ceiling=ceiling)
+
+    def new_hasher(self, file_path: Path, append: bool):
+        """去重模式下创建流式SHA-256，续传时先计入已有部分"""
+        if self.blob_store is None:
+            return None
+        hasher = hashlib.sha256()
+        if append:
+            with open(file_path, "rb") as f:
+                while chunk := f.read(1024 * 1024):
+                    hasher.update(chunk)
+        return hasher
+
+    def mark_complete(self, url: str, file_path: Path, etag: str | None = None):
+        """将下载完成并通过大小校验的文件记入完整性索引"""
+        self.manifest.mark_complete(file_path.as_posix(), url, file_path.stat().st_size, etag)
+
+    def finish_download(self, url: str, file_path: Path, hasher=None, etag: str | None = None):
+        """下载完成后的收尾：存入去重存储、记入完整性索引"""
+        self.store_blob(url, file_path, hasher)
+        self.mark_complete(url, file_path, etag)
+        self.logger.info(f"下载完成: {url}")
+
+    def should_segment(self, existing_size: int, status_code: int, expected: int, headers) -> bool:
+        """大文件（超过阈值且服务器支持Range）改用分段多连接下载"""
+        return (existing_size == 0 and status_code == 200
+                and self.segment_count > 1 and 0 < self.segment_threshold <= expected
+                and headers.get("Accept-Ranges", "").lower() == "bytes"
+                and not headers.get("Content-Encoding"))
+
+    def segmented_size(self, file_path: Path) -> int | None:
+        """存在未完成的分段下载时返回文件总大小"""
+        state_path = segment_state_path(file_path)
+        if not state_path.exists():
+            return None
+        try:
+            with open(state_path, "r", encoding="utf-8") as f:
+                return int(json.load(f)["size"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def download_segmented(self, url: str, file_path: Path, total: int):
+        """分段下载大文件，失败时抛出异常并保留各段进度"""
+        self.logger.info(f"分段下载: {url}, 大小 {total} bytes, 分段数 {self.segment_count}")
+        SegmentedDownload(self.session, url, file_path, total, segments=self.segment_count,
+                          max_retry_times=self.max_retry_times, logger=self.logger, retry_policy=self.retry_policy).run()
+
+    def discard_partial(self, file_path: Path):
+        """下载失败时保留 .part 与进度文件以便下次续传，只清理没有写入任何内容的 .part"""
+        path = part_path(file_path)
+        try:
+            if path.exists() and path.stat().st_size == 0 and not segment_state_path(path).exists():
+                path.unlink()
+                part_state_path(file_path).unlink(missing_ok=True)
+        except OSError:
+            pass
+
+    def store_blob(self, url: str, file_path: Path, hasher=None):
+        """去重模式下将下载完成的文件纳入内容寻址存储"""
+        if self.blob_store is None:
+            return
+        try:
+            self.blob_store.adopt(url, file_path, hasher.hexdigest() if hasher else None)
+        except OSError as e:
+            self.logger.warning(f"文件存入去重存储失败: {url}: {e}")
+
+    def fetch_file(self, url: str, file_path: Path) -> tuple[int, float]:
+        """单次下载尝试，写入 .part 并在大小校验后重命名，支持断点续传与分段下载，
+        返回 (写入字节数, 首字节延迟秒数)，失败时抛出异常并保留进度"""
+        part = PartFile(url, file_path)
+        segmented_total = self.segmented_size(part.path)
+        if segmented_total:
+            started = time.monotonic()
+            self.download_segmented(url, part.path, segmented_total)
+            self.commit_part(part)
+            return segmented_total, time.monotonic() - started
+
+        existing_size = part.offset
+        with self.session.get(url, stream=True, headers=part.resume_headers()) as resp:
+            latency = resp.elapsed.total_seconds()
+            action, expected, append = self.begin_response(part, existing_size, resp.status_code, resp.headers,
+                                                           resp.raise_for_status)
+            if action == "stream":
+                hasher = self.new_hasher(part.path, append)
+                with PartWriter(part, append, hasher) as writer:
+                    for chunk in resp.iter_content(chunk_size=1024 * 256):
+                        writer.write(chunk)
+        if action == "satisfied":
+            self.finish_satisfied_part(part)
+            return 0, latency
+        if action == "segment":
+            self.download_segmented(url, part.path, expected)
+            self.commit_part(part)
+            return expected, latency
+        self.commit_part(part, hasher)
+        return writer.bytes_written, latency
+
+    def begin_response(self, part: PartFile, existing_size: int, status_code: int, headers,
+                       raise_for_status) -> tuple[str, int, bool]:
+        """根据响应状态与响应头决定本次尝试的处理方式（两种引擎共用），返回 (处理方式, Content-Length, 是否追加写入)：
+        satisfied（416，交给 finish_satisfied_part 判断 .part 是否已完整）/ segment（改用分段下载）/ stream（流式写入 .part）；
+        错误状态由 raise_for_status 抛出各引擎自己的HTTP异常"""
+        if status_code == 416:
+            return "satisfied", 0, False
+        raise_for_status()
+        expected = int(headers.get("content-length", 0))
+        if self.should_segment(existing_size, status_code, expected, headers):
+            part.begin(status_code, headers, expected)
+            return "segment", expected, False
+        append = part.begin(status_code, headers, expected)
+        if existing_size > 0 and not append:
+            self.logger.info(f"文件已变化或服务器不支持续传，重新下载: {part.url}")
+        return "stream", expected, append
+
+    def commit_part(self, part: PartFile, hasher=None):
+        """校验 .part 大小后原子重命名到最终路径（归档模式下追加到分片），完成收尾"""
+        if self.archive:
+            self.archive_part(part)
+            return
+        part.commit()
+        self.finish_download(part.url, part.file_path, hasher, part.state.get("etag"))
+
+    def shard_for(self, output_dir: Path) -> ArchiveShard:
+        """获取页目录对应的归档分片，同一分片在进程内只打开一次"""
+        path = shard_path(output_dir)
+        with self._shards_lock:
+            if path not in self.shards:
+                self.shards[path] = ArchiveShard(path)
+            return self.shards[path]
+
+    def archive_part(self, part: PartFile):
+        """归档模式：校验 .part 大小后追加到所属页的分片，并删除暂存文件"""
+        part.verify()
+        shard, name = self.staged[part.file_path]
+        shard.add(name, part.path, part.url)
+        part.reset()
+        self.logger.info(f"下载完成: {part.url} -> {shard.path.name}")
+
+    def finish_satisfied_part(self, part: PartFile):
+        """处理416：.part 已完整时完成下载，否则丢弃进度并抛出异常以便从头重试"""
+        if not part.range_satisfied():
+            part.reset()
+            raise IncompleteDownloadError("(服务器返回416，已下载的 .part 与记录的总大小不一致或总大小未知)")
+        self.commit_part(part)
+
+    def http_status(self, e: Exception) -> tuple[int, dict] | None:
+        """HTTP错误的 (状态码, 响应头)，不是HTTP错误时返回None"""
+        if isinstance(e, HTTPError) and e.response is not None:
+            return e.response.status_code, e.response.headers
+        return None
+
+    def classify_error(self, e: Exception) -> tuple[str, str, bool, float | None]:
+        """将下载异常归类为 (原因, 重试原因标签, 是否属于限流/超时, Retry-After秒数)，两种引擎共用；
+        标签为 http_<状态码>/short_read/timeout/connection/other"""
+        http = self.http_status(e)
+        if http is not None:
+            status_code, headers = http
+            throttled = status_code in THROTTLE_STATUS or status_code >= 500
+            return f"http {status_code}", f"http_{status_code}", throttled, parse_retry_after(headers.get("Retry-After"))
+        reason = str(e) or type(e).__name__
+        if isinstance(e, self.SHORT_READ_ERRORS):
+            return reason, "short_read", False, None
+        if isinstance(e, self.TIMEOUT_ERRORS):
+            return reason, "timeout", True, None
+        if isinstance(e, self.CONNECTION_ERRORS):
+            return reason, "connection", True, None
+        return reason, "other", False, None
+
+    def on_attempt_failed(self, url: str, file_path: Path, e: Exception, retry_time: int, max_retry_times: int,
+                          reason_list: list[str]) -> float:
+        """一次下载尝试失败后的处理（两种引擎共用）：记录原因与指标、保留续传进度、限流时降低并发，
+        返回下次尝试前应等待的秒数"""
+        reason, cause, throttled, retry_after = self.classify_error(e)
+        reason_list.append(reason)
+        self.logger.warning(f"重试第{retry_time}次/总{max_retry_times}次失败 : {url}: {reason}")
+        self.discard_partial(file_path)
+        self.record_retry_metrics(cause)
+        delay = self.retry_policy.delay(retry_time, retry_after)
+        if throttled:
+            if self.concurrency.on_throttle(delay, retry_after):
+                delay = self.concurrency.paused_for()
+            metrics.set("concurrency_limit", self.concurrency.current_limit)
+        return delay
+
+    def on_download_failed(self, url: str, max_retry_times: int, reason_list: list[str]) -> tuple[str, str, list[str]]:
+        """重试次数用尽"""
+        self.logger.error(f"下载失败: {url}，重试次数: {max_retry_times}, 原因: {', '.join(reason_list)}")
+        metrics.inc("downloads_total", status="failed")
+        return url, "failed", reason_list
+
     def download_file(self, url: str, file_path: Path, max_retry_times:int = 3) -> tuple[str, str, str]:
-        """下载单个文件，支持断点续传和重试机制"""
+        """下载单个文件，支持断点续传和重试机制，每次尝试占用并发控制器的一个名额"""
+        reason_list: list[str] = []
         for retry_time in range(1, max_retry_times + 1):
-            reason_list: list[str] = []
+            self.concurrency.acquire()
+            metrics.add("downloads_active", 1)
             try:
-                existing_size = file_path.stat().st_size if file_path.exists() else 0
-                request_headers = {}
-                
-                if existing_size > 0:
-                    request_headers["Range"] = f"bytes={existing_size}-"
-
-                resp = self.session.get(url, stream=True, timeout=20, headers=request_headers)
-                
-                if resp.status_code == 416:
-                    self.logger.info(f"下载完成: {url}")
-                    return url, "success", ""
-                resp.raise_for_status()
-                expected = int(resp.headers.get("content-length", 0))
-                bytes_written = 0
-                if resp.status_code == 206 and expected > 0:
-                    mode = "ab"
-                else:
-                    mode = "wb"
-
-                if mode == "wb" and existing_size > 0:
-                    existing_size = 0
-                
-                with open(file_path, mode) as f:
-                    for chunk in resp.iter_content(chunk_size=1024 * 256):
-                        if chunk:
-                            f.write(chunk)
-                            bytes_written += len(chunk)
-                if expected and bytes_written != expected:
-                    raise IOError(f"(已下载 {bytes_written} bytes , 剩余{expected - bytes_written}bytes未下载完成)")
-                if expected and resp.status_code == 206:
-                    total = existing_size + bytes_written
-                    if total != existing_size + expected:
-                        raise IOError(f"(已下载 {total} bytes , 剩余{existing_size + expected - total}bytes未下载完成)")
-                self.logger.info(f"下载完成: {url}")
-                return url, "success", ""
-            except HTTPError as e:
-                status_code = e.response.status_code if e.response is not None else None
-                if status_code:
-                    reason = f"http {status_code}"
-                else:
-                    reason = str(e)
-                reason_list.append(reason)
-                self.logger.warning(f"重试第{retry_time}次/总{max_retry_times}次失败 : {url}: {reason}")
-                try:
-                    if file_path.exists():
-                        file_path.unlink()
-                except Exception:
-                    pass
-                time.sleep(2 * retry_time)
+                nbytes, latency = self.fetch_file(url, file_path)
             except Exception as e:
-                reason = str(e)
-                reason_list.append(reason)
-                self.logger.warning(f"重试第{retry_time}次/总{max_retry_times}次失败 : {url}: {reason}")
-                try:
-                    if file_path.exists():
-                        file_path.unlink()
-                except Exception:
-                    pass
-                time.sleep(2 * retry_time)
-        self.logger.error(f"下载失败: {url}，重试次数: {max_retry_times}, 原因: {', '.join(reason_list)}")
-        return url, "failed", reason_list
+                delay = self.on_attempt_failed(url, file_path, e, retry_time, max_retry_times, reason_list)
+            else:
+                self.record_success_metrics(latency, nbytes)
+                return url, "success", ""
+            finally:
+                metrics.add("downloads_active", -1)
+                self.concurrency.release()
+            if retry_time < max_retry_times:
+                time.sleep(delay)
+        return self.on_download_failed(url, max_retry_times, reason_list)
+
+    def record_success_metrics(self, latency: float, nbytes: int):
+        """记录一次成功下载：反馈给并发控制器，并记录延迟、字节数与当前并发上限"""
+        self.concurrency.on_success(latency, nbytes)
+        metrics.observe("download_latency_seconds", latency)
+        metrics.inc("download_bytes_total", nbytes)
+        metrics.inc("downloads_total", status="success")
+        metrics.set("concurrency_limit", self.concurrency.current_limit)
+
+    def record_retry_metrics(self, cause: str):
+        """按原因记录一次失败的下载尝试"""
+        metrics.inc("download_retries_total", cause=cause)
         
-    def start_download(self, data_set_number: int):
-        """开始下载数据集中的文件，使用多线程并发下载，记录下载结果"""
-        status_report: dict[str, dict[str, str]] = {}
-        status_lock = threading.Lock()
-        scheduled_urls: set[str] = set()
+    def run_tasks(self, tasks: Iterable[tuple[str, str, Path]]) -> Iterator[tuple[str, str, str, str]]:
+        """执行下载任务（线程池后端），按完成顺序产出 (output_key, url, status, reason)；
+        tasks 可以是列表，也可以是边认领边产出的迭代器：整个运行只用一个线程池，在途任务不足两倍线程数时才取下一个任务"""
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        source = iter(tasks)
+        total = len(tasks) if isinstance(tasks, Sized) else None
+        in_flight: dict = {}
+        finished = 0
+
+        def refill():
+            while len(in_flight) < self.max_workers * 2:
+                task = next(source, None)
+                if task is None:
+                    return
+                output_key, link, file_path = task
+                future = executor.submit(self.download_file, link, file_path, self.max_retry_times)
+                in_flight[future] = (output_key, link)
+
         try:
-            with open(self.page_dir / f"data-set-{data_set_number}" / f"dataset{data_set_number}_file_links.json", 'r') as f:
-                data: dict[str, list[str]] = json.load(f)
-        except FileNotFoundError:
+            refill()
+            while in_flight:
+                metrics.set("queue_depth", total - finished if total is not None else len(in_flight))
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    output_key, link = in_flight.pop(future)
+                    try:
+                        url, status, reason = future.result()
+                    except Exception as e:
+                        self.logger.error(f"下载 {link} 时发生错误: {type(e).__name__}: {e}")
+                        url, status, reason = link, "failed", [f"{type(e).__name__}: {e}"]
+                    finished += 1
+                    yield output_key, url, status, reason
+                refill()
+            metrics.set("queue_depth", 0)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def folder_key(self, output_path: Path) -> str:
+        """输出文件夹在状态记录中的键，位于项目根目录下时使用相对路径"""
+        if output_path.is_relative_to(BASE_DIR):
+            return output_path.relative_to(BASE_DIR).as_posix()
+        return output_path.as_posix()
+
+    def register_links(self, data_set_number: int) -> bool:
+        """将数据集的链接登记到下载清单，首次登记时迁移已有的 downloads_status.json"""
+        page_links = self.iter_links(data_set_number)
+        if page_links is None:
             self.logger.error(f"数据集 {data_set_number} 的文件——链接JSON文件未找到，无法开始下载。请先运行page命令下载并提取链接。")
-            return
+            return False
+
+        self.migrate_status_json(data_set_number)
+        for page, link_list in page_links:
+            self.register_page(data_set_number, page, link_list)
+        return True
+
+    def iter_links(self, data_set_number: int) -> Iterator[tuple[int|str, list[str]]] | None:
+        """逐页读取数据集的链接：优先逐行读取爬取检查点(NDJSON)，没有时读取链接JSON；都不存在时返回None"""
+        return iter_data_set_links(self.page_dir, data_set_number)
+
+    def migrate_status_json(self, data_set_number: int):
+        """数据集首次登记时，迁移已有的 downloads_status.json"""
+        status_json_path = self.file_dir / f"data-set-{data_set_number}" / "downloads_status.json"
+        if not self.manifest.has_data_set(data_set_number) and status_json_path.exists():
+            with open(status_json_path, "r", encoding="utf-8") as f:
+                self.manifest.import_json(data_set_number, json.load(f))
+            self.logger.info(f"数据集 {data_set_number} 已从 downloads_status.json 迁移下载状态。")
+
+    def register_page(self, data_set_number: int, page, link_list: list[str]) -> list[tuple[str, str]]:
+        """登记某页的链接，返回归属该页（非重复）的 (folder, url)"""
+        output_path = self.file_dir / f"data-set-{data_set_number}" / f"page_{page}"
+        folder = self.folder_key(output_path)
+        return [(folder, url) for url in self.manifest.register(data_set_number, page, folder, link_list)]
+
+    def prepare_tasks(self, data_set_number: int, rows: list[tuple[str, str]],
+                      completed: dict[str, int] | None = None,
+                      sizes: dict[str, int] | None = None) -> list[tuple[str, str, Path]]:
+        """将 (folder, url) 转为下载任务，离线跳过已完成文件、链接去重存储中已有的文件；
+        分批调用时由调用方传入一次运行内共用的完整性索引 completed 与勘测大小 sizes 快照，避免每批重新读取整张表"""
+        if self.shard is not None:
+            rows = [(folder, url) for folder, url in rows if shard_of(url, self.shard[1]) == self.shard[0]]
+        if self.archive:
+            return self.order_tasks(data_set_number, self.prepare_archive_tasks(data_set_number, rows), sizes)
+        tasks: list[tuple[str, str, Path]] = []
+        for folder, url in rows:
+            output_dir = BASE_DIR / folder
+            output_dir.mkdir(parents=True, exist_ok=True)
+            tasks.append((folder, url, output_dir / url.split("/")[-1]))
+        tasks = self.skip_complete_files(data_set_number, tasks, completed)
+        if self.blob_store is not None:
+            tasks = self.link_stored_blobs(data_set_number, tasks)
+        return self.order_tasks(data_set_number, tasks, sizes)
+
+    def order_tasks(self, data_set_number: int, tasks: list[tuple[str, str, Path]],
+                    sizes: dict[str, int] | None = None) -> list[tuple[str, str, Path]]:
+        """运行过 plan 勘测大小时按从大到小排列任务，缩短整体耗时；未勘测时保持页面顺序"""
+        if sizes is None:
+            sizes = self.manifest.expected_sizes(data_set_number)
+        return largest_first(tasks, sizes) if sizes else tasks
+
+    def prepare_archive_tasks(self, data_set_number: int, rows: list[tuple[str, str]]) -> list[tuple[str, str, Path]]:
+        """归档模式：按分片索引离线跳过已归档的文件，其余下载到数据集的 .staging 目录，完成后追加到分片"""
+        tasks: list[tuple[str, str, Path]] = []
+        skipped = 0
+        for folder, url in rows:
+            output_dir = BASE_DIR / folder
+            shard = self.shard_for(output_dir)
+            name = url.split("/")[-1]
+            if shard.contains(name):
+                self.manifest.record(data_set_number, url, "success", shard.size(name), attempted=False)
+                skipped += 1
+                continue
+            staging_dir = output_dir.parent / ".staging"
+            staging_dir.mkdir(parents=True, exist_ok=True)
+            file_path = staging_dir / f"{output_dir.name}-{name}"
+            self.staged[file_path] = (shard, name)
+            tasks.append((folder, url, file_path))
+        if skipped:
+            self.logger.info(f"数据集 {data_set_number} 按分片索引跳过 {skipped} 个已归档文件，剩余 {len(tasks)} 个需请求。")
+        return tasks
+
+    def stored_size(self, file_path: Path) -> int:
+        """下载完成的文件大小，归档模式下从分片索引读取"""
+        if file_path in self.staged:
+            shard, name = self.staged[file_path]
+            return shard.size(name) or 0
+        return file_path.stat().st_size if file_path.exists() else 0
+
+    def record_result(self, data_set_number: int, url: str, file_path: Path, status: str, reason):
+        """将一次下载结果写入清单"""
+        if status == "success":
+            size = self.stored_size(file_path)
+            self.staged.pop(file_path, None)
+            self.manifest.record(data_set_number, url, "success", size)
+        else:
+            error = ", ".join(reason) if isinstance(reason, list) else str(reason)
+            self.manifest.record(data_set_number, url, "failed", error=error)
 
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            futures = []
-            future_to_output: dict = {}
-            for page, link_list in data.items():
-                output_path = self.file_dir / f"data-set-{data_set_number}" / f"page_{page}"
-                output_path.mkdir(parents=True, exist_ok=True)
-                if output_path.is_relative_to(BASE_DIR):
-                    output_key = output_path.relative_to(BASE_DIR).as_posix()
-                else:
-                    output_key = output_path.as_posix()
-                status_report.setdefault(output_key, {})
-                for link in link_list:
-                    if link in scheduled_urls:
-                        with status_lock:
-                            status_report[output_key][link] = "skipped (duplicate)"
-                        continue
-                    scheduled_urls.add(link)
-                    filename = link.split("/")[-1]
-                    file_path = output_path / filename
-                    future = executor.submit(self.download_file, link, file_path)
-                    futures.append(future)
-                    future_to_output[future] = output_key
-
-            for future in as_completed(futures):
-                url, status, reason = future.result()
-                output_key = future_to_output.get(future, "")
-                if output_key:
-                    with status_lock:
-                        status_report.setdefault(output_key, {})
-                        if status == "success":
-                            status_report[output_key][url] = "success"
-                        else:
-                            status_report[output_key][url] = f"failed: {reason}"
+    def download_rows(self, data_set_number: int, rows: list[tuple[str, str]]):
+        """下载清单中查询出的 (folder, url)，结果随完成顺序批量写入清单"""
+        tasks = self.prepare_tasks(data_set_number, rows)
+        file_paths = {url: file_path for _, url, file_path in tasks}
+        try:
+            for _, url, status, reason in self.run_tasks(tasks):
+                self.record_result(data_set_number, url, file_paths[url], status, reason)
+        finally:
+            self.write_status_json(data_set_number)
+
+    def download_leased(self, data_set_number: int, statuses: tuple[str, ...]):
+        """多进程/多机协作下载：以租约逐批认领链接，认领到的任务持续送入同一个下载执行器，
+        队列快取完时再认领下一批，批次之间不等待最慢的下载；没有可认领的链接后等待其他进程的租约结束或过期。
+        后台线程定期续租，进程退出后未完成的租约过期即由其他进程重新认领"""
+        since = time.time()
+        stop = threading.Event()
+
+        def keep_alive():
+            while not stop.wait(self.lease_seconds / 3):
+                self.manifest.renew(self.worker_id, self.lease_seconds)
+
+        renewer = threading.Thread(target=keep_alive, name="lease-renewer", daemon=True)
+        renewer.start()
+        claimed = 0
+        # 认领的批次之间共用一份快照，每批只增量合并其他进程新完成的文件（重新认领的 success 链接可能刚被它们下载完）
+        completed, completed_rowid = self.manifest.completed_after(0)
+        sizes = self.manifest.expected_sizes(data_set_number)
+        file_paths: dict[str, Path] = {}
+
+        def claim_tasks() -> Iterator[tuple[str, str, Path]]:
+            """逐批认领并产出任务，暂时没有可认领的链接时结束（不在此等待，以免阻塞本进程结果的记录）"""
+            nonlocal claimed, completed_rowid
+            while True:
+                # 先提交已完成的结果，认领时才能看到最新状态
+                self.manifest.flush()
+                rows = self.manifest.claim(data_set_number, self.worker_id, self.lease_batch, self.lease_seconds,
+                                           statuses, since, self.shard)
+                if not rows:
+                    return
+                claimed += len(rows)
+                fresh, completed_rowid = self.manifest.completed_after(completed_rowid)
+                completed.update(fresh)
+                for task in self.prepare_tasks(data_set_number, rows, completed, sizes):
+                    file_paths[task[1]] = task[2]
+                    yield task
+
+        try:
+            while True:
+                for _, url, status, reason in self.run_tasks(claim_tasks()):
+                    self.record_result(data_set_number, url, file_paths.pop(url), status, reason)
+                self.manifest.flush()
+                # 其他进程仍持有租约时等待：它们完成或退出后租约过期，未完成的链接可被重新认领
+                if not self.manifest.leased_by_others(data_set_number, self.worker_id):
+                    break
+                time.sleep(min(5.0, self.lease_seconds / 3))
+        finally:
+            stop.set()
+            renewer.join()
+            self.manifest.release(self.worker_id)
+            self.write_status_json(data_set_number)
+            self.logger.info(f"数据集 {data_set_number} 本进程({self.worker_id})认领 {claimed} 个链接。")
+
+    def skip_complete_files(self, data_set_number: int, tasks: list[tuple[str, str, Path]],
+                            completed: dict[str, int] | None = None) -> list[tuple[str, str, Path]]:
+        """根据完整性索引离线跳过大小一致的已完成文件，只将不完整或未知的文件交给网络"""
+        if completed is None:
+            completed = self.manifest.completed_sizes()
+        remaining = []
+        skipped = 0
+        for task in tasks:
+            _, url, file_path = task
+            size = completed.get(file_path.as_posix())
+            try:
+                complete = size is not None and file_path.stat().st_size == size
+            except OSError:
+                complete = False
+            if not complete:
+                remaining.append(task)
+                continue
+            self.manifest.record(data_set_number, url, "success", size, attempted=False)
+            skipped += 1
+        if skipped:
+            self.logger.info(f"数据集 {data_set_number} 离线跳过 {skipped} 个已完成文件，剩余 {len(remaining)} 个需请求。")
+        return remaining
+
+    def link_stored_blobs(self, data_set_number: int, tasks: list[tuple[str, str, Path]]) -> list[tuple[str, str, Path]]:
+        """已存入去重存储的URL直接链接到目标目录并记为成功，返回仍需下载的任务"""
+        remaining = []
+        linked = 0
+        for task in tasks:
+            _, url, file_path = task
+            hit = self.blob_store.lookup(url)
+            if hit is None:
+                remaining.append(task)
+                continue
+            sha256, size = hit
+            try:
+                self.blob_store.link_into(sha256, file_path)
+            except OSError as e:
+                self.logger.warning(f"从去重存储链接文件失败: {url}: {e}")
+                remaining.append(task)
+                continue
+            self.manifest.record(data_set_number, url, "success", size, attempted=False)
+            self.mark_complete(url, file_path)
+            linked += 1
+        if linked:
+            self.logger.info(f"数据集 {data_set_number} 从去重存储链接 {linked} 个文件，无需下载。")
+        return remaining
 
+    def write_status_json(self, data_set_number: int):
+        """将下载清单导出为 downloads_status.json；清单中还没有该数据集时不写，以免用空结果覆盖尚未迁移的旧文件"""
+        if not self.manifest.has_data_set(data_set_number):
+            return
         report_path = self.file_dir / f"data-set-{data_set_number}" / "downloads_status.json"
         report_path.parent.mkdir(parents=True, exist_ok=True)
+        # 多个进程可能同时导出，先写临时文件再替换
+        tmp_path = report_path.with_name(f"{report_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest.export_json(data_set_number), f, ensure_ascii=False, indent=2)
+        tmp_path.replace(report_path)
+
+    def plan(self, data_set_number: int) -> dict | None:
+        """下载前勘测：限速并发HEAD所有待下载链接，记录大小与ETag，统计数据集总大小与剩余待下载字节，
+        检查磁盘可用空间；返回勘测汇总，没有链接时返回None"""
+        if not self.register_links(data_set_number):
+            return None
+        rows = self.manifest.select(data_set_number, ("pending", "failed"))
+        if self.shard is not None:
+            rows = [(folder, url) for folder, url in rows if shard_of(url, self.shard[1]) == self.shard[0]]
+        self.logger.info(f"数据集 {data_set_number} 开始勘测 {len(rows)} 个待下载文件的大小。")
+        survey = SizeSurvey(self.session, max_workers=self.plan_workers, rate_limit=self.plan_rate_limit,
+                            max_retry_times=self.max_retry_times, retry_policy=self.retry_policy)
+        results = survey.run([url for _, url in rows])
+        self.manifest.record_plan(data_set_number, results)
+        sizes = {url: size for url, size, _ in results if size is not None}
+        # 已有 .part 的部分无需再次下载；分段下载的 .part 已预分配到完整大小，按分段进度计算
+        remaining = 0
+        for folder, url in rows:
+            if url not in sizes:
+                continue
+            path = part_path(BASE_DIR / folder / url.split("/")[-1])
+            left = remaining_segment_bytes(path)
+            if left is None:
+                left = max(0, sizes[url] - (path.stat().st_size if path.exists() else 0))
+            remaining += left
+        free = free_space(self.file_dir)
+        summary = {
+            "data_set": data_set_number,
+            "files": len(rows),
+            "sized": len(sizes),
+            "unknown": len(rows) - len(sizes),
+            "total_bytes": sum(sizes.values()),
+            "remaining_bytes": remaining,
+            "largest_bytes": max(sizes.values(), default=0),
+            "free_bytes": free,
+            "fits": remaining <= free,
+        }
+        self.logger.info(f"数据集 {data_set_number} 勘测完成: {len(sizes)}/{len(rows)} 个文件获取到大小，"
+                         f"共 {summary['total_bytes'] / 1024 ** 3:.2f} GB，剩余待下载 {remaining / 1024 ** 3:.2f} GB，"
+                         f"磁盘可用 {free / 1024 ** 3:.2f} GB。")
+        if not summary["fits"]:
+            self.logger.warning(f"数据集 {data_set_number} 剩余待下载大小超过磁盘可用空间 {(remaining - free) / 1024 ** 3:.2f} GB。")
+        return summary
+
+    def verify(self, data_set_number: int, want_hash: bool = False, max_workers: int | None = None) -> dict:
+        """在进程池中校验已下载成功的文件：PDF文件头、%%EOF 结尾（仅 .pdf 链接）、与预期大小一致，可选计算SHA-256并与去重存储记录比对；
+        不通过的文件删除（归档模式从分片索引移除）并在清单中标记为失败，下次下载或重试时重新下载"""
+        begin = time.monotonic()
+        rows = self.manifest.verify_rows(data_set_number)
+        targets: list[tuple[str, Path, ArchiveShard | None]] = []
+        tasks: list[tuple] = []
+        for folder, url, expected in rows:
+            output_dir = BASE_DIR / folder
+            name = url.split("/")[-1]
+            file_path = output_dir / name
+            shard = None
+            if not file_path.exists() and shard_path(output_dir).exists():
+                shard = self.shard_for(output_dir)
+            member = shard.members().get(name) if shard is not None else None
+            if member is not None:
+                tasks.append((str(shard.path), member["offset"], member["size"], expected, want_hash, is_pdf(url)))
+            else:
+                tasks.append((str(file_path), 0, None, expected, want_hash, is_pdf(url)))
+            targets.append((url, file_path, shard))
+        self.logger.info(f"数据集 {data_set_number} 开始校验 {len(tasks)} 个文件。")
+        results = verify_files(tasks, max_workers=max_workers)
+        bad: dict[str, str] = {}
+        for (url, file_path, shard), (problem, size, digest) in zip(targets, results):
+            if not problem and digest is not None:
+                blob = self.manifest.blob_for_url(url)
+                if blob is not None and blob[0] != digest:
+                    problem = "sha256_mismatch"
+            metrics.inc("verify_files_total", result=problem or "ok")
+            if not problem:
+                continue
+            bad[url] = problem
+            if shard is not None:
+                shard.discard(url.split("/")[-1])
+            else:
+                file_path.unlink(missing_ok=True)
+            self.manifest.forget_file(file_path.as_posix(), url)
+            self.manifest.record(data_set_number, url, "failed", error=f"verify: {problem}", attempted=False)
+        self.manifest.flush()
+        reasons: dict[str, int] = {}
+        for problem in bad.values():
+            reasons[problem] = reasons.get(problem, 0) + 1
+        summary = {
+            "data_set": data_set_number,
+            "checked": len(tasks),
+            "ok": len(tasks) - len(bad),
+            "bad": len(bad),
+            "reasons": reasons,
+            "seconds": round(time.monotonic() - begin, 3),
+        }
+        report_path = self.file_dir / f"data-set-{data_set_number}" / "verify_report.json"
+        report_path.parent.mkdir(parents=True, exist_ok=True)
         with open(report_path, "w", encoding="utf-8") as f:
-            json.dump(status_report, f, ensure_ascii=False, indent=2)
-            
+            json.dump({**summary, "files": bad}, f, ensure_ascii=False, indent=2)
+        if bad:
+            self.write_status_json(data_set_number)
+            self.logger.warning(f"数据集 {data_set_number} 校验发现 {len(bad)} 个问题文件 {reasons}，已标记为失败，"
+                                f"可运行 file -r 重新下载。")
+        self.logger.info(f"数据集 {data_set_number} 校验完成: {summary['ok']}/{len(tasks)} 通过，用时 {summary['seconds']}s。")
+        return summary
+
+    def start_download(self, data_set_number: int):
+        """开始下载数据集中的文件，已完成的文件经完整性索引校验后离线跳过，其余并发下载，记录下载结果"""
+        if not self.register_links(data_set_number):
+            return
+        if self.lease:
+            self.download_leased(data_set_number, ("pending", "failed", "success"))
+            return
+        rows = self.manifest.select(data_set_number, ("pending", "failed", "success"))
+        self.logger.info(f"数据集 {data_set_number} 文件数: {len(rows)}")
+        self.download_rows(data_set_number, rows)
+
     def retry_failed_downloads(self, data_set_number: int):
         """重试下载失败的文件，更新下载结果"""
         status_json_path = self.file_dir / f"data-set-{data_set_number}" / "downloads_status.json"
-        try:
+        if not self.manifest.has_data_set(data_set_number):
+            if not status_json_path.exists():
+                self.logger.error(f"数据集 {data_set_number} 没有下载记录，无法重试下载。请先运行start_download方法开始下载。")
+                return
             with open(status_json_path, "r", encoding="utf-8") as f:
-                failed_dict: dict[str, dict[str, str]] = json.load(f)
-        except FileNotFoundError:
-            self.logger.error(f"数据集 {data_set_number} 的下载状态JSON文件未找到，无法重试下载。请先运行start_download方法开始下载。")
+                self.manifest.import_json(data_set_number, json.load(f))
+        if self.lease:
+            self.download_leased(data_set_number, ("failed",))
             return
-        failed_again = {}
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            futures = []
-            future_to_folder: dict = {}
-            for folder, status_dict in failed_dict.items():
-                for url, status in status_dict.items():
-                    if not isinstance(status, str) or not status.startswith("failed"):
-                        continue
-                    output_dir = Path(folder)
-                    output_dir.mkdir(parents=True, exist_ok=True)
-                    filename = url.split("/")[-1]
-                    file_path = output_dir / filename
-                    future = executor.submit(self.download_file, url, file_path)
-                    futures.append(future)
-                    future_to_folder[future] = folder
-
-            for future in as_completed(futures):
-                failed_url = future.result()
-                if failed_url:
-                    folder = future_to_folder.get(future, "")
-                    failed_again.setdefault(folder, {})
-                    failed_again[folder][failed_url] = "failed: retry failed"
-
-        if failed_again:
-            with open(status_json_path, "w", encoding="utf-8") as f:
-                json.dump(failed_again, f, ensure_ascii=False, indent=2)
+        rows = self.manifest.select(data_set_number, ("failed",))
+        self.logger.info(f"数据集 {data_set_number} 待重试文件数: {len(rows)}")
+        self.download_rows(data_set_number, rows)
@@ -0,0 +1,300 @@
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS downloads (
+    data_set INTEGER NOT NULL,
+    url TEXT NOT NULL,
+    page TEXT NOT NULL,
+    folder TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    bytes INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    lease_owner TEXT,
+    lease_expires REAL,
+    expected_size INTEGER,
+    etag TEXT,
+    planned_at REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (data_set, url)
+);
+CREATE INDEX IF NOT EXISTS idx_downloads_status ON downloads (data_set, status);
+CREATE TABLE IF NOT EXISTS duplicates (
+    data_set INTEGER NOT NULL,
+    folder TEXT NOT NULL,
+    url TEXT NOT NULL,
+    PRIMARY KEY (data_set, folder, url)
+);
+CREATE TABLE IF NOT EXISTS completed (
+    path TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    etag TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    url TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+_ADDED_COLUMNS = {"lease_owner": "TEXT", "lease_expires": "REAL",
+                  "expected_size": "INTEGER", "etag": "TEXT", "planned_at": "REAL"}
+
+def shard_of(url: str, count: int) -> int:
+    """URL所属的静态分片序号（CRC32取模，跨进程、跨机器稳定）"""
+    return zlib.crc32(url.encode("utf-8")) % count
+
+class DownloadManifest:
+    """基于SQLite的下载状态清单，每个URL一行，结果按批次在事务中写入"""
+    def __init__(self, db_path: str|Path, batch_size: int = 200, flush_interval: float = 2.0, wal: bool = True):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.RLock()
+        self._buffer: list[tuple] = []
+        self._complete_buffer: list[tuple] = []
+        self._last_flush = time.monotonic()
+        self.conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        # WAL 依赖共享内存，多台机器通过网络文件系统共用清单时需关闭
+        self.conn.execute(f"PRAGMA journal_mode={'WAL' if wal else 'DELETE'}")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self._migrate()
+        self.conn.commit()
+        self.conn.create_function("shard_of", 2, shard_of, deterministic=True)
+
+    def _migrate(self):
+        """为旧版清单补充租约与大小勘测字段"""
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(downloads)")}
+        for column, column_type in _ADDED_COLUMNS.items():
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE downloads ADD COLUMN {column} {column_type}")
+
+    def has_data_set(self, data_set: int) -> bool:
+        with self._lock:
+            row = self.conn.execute("SELECT 1 FROM downloads WHERE data_set = ? LIMIT 1", (data_set,)).fetchone()
+        return row is not None
+
+    def register(self, data_set: int, page: str, folder: str, urls: list[str]) -> list[str]:
+        """登记某页的链接，新链接状态为pending，已登记的链接保持原状态；同一数据集内的重复链接记入duplicates。
+        返回归属该页（非重复）的链接"""
+        now = time.time()
+        owned: list[str] = []
+        with self._lock, self.conn:
+            for url in urls:
+                # INSERT OR IGNORE 使多个进程同时登记同一页时不会冲突
+                inserted = self.conn.execute(
+                    "INSERT OR IGNORE INTO downloads (data_set, url, page, folder, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (data_set, url, str(page), folder, now, now)).rowcount
+                if inserted:
+                    owned.append(url)
+                    continue
+                row = self.conn.execute("SELECT folder FROM downloads WHERE data_set = ? AND url = ?", (data_set, url)).fetchone()
+                if row[0] != folder:
+                    self.conn.execute("INSERT OR IGNORE INTO duplicates (data_set, folder, url) VALUES (?, ?, ?)",
+                                      (data_set, folder, url))
+                elif url not in owned:
+                    owned.append(url)
+        return owned
+
+    def select(self, data_set: int, statuses: tuple[str, ...] = ("pending", "failed")) -> list[tuple[str, str]]:
+        """按状态查询链接，返回 (folder, url) 列表"""
+        marks = ",".join("?" * len(statuses))
+        with self._lock:
+            return self.conn.execute(
+                f"SELECT folder, url FROM downloads WHERE data_set = ? AND status IN ({marks}) ORDER BY rowid",
+                (data_set, *statuses)).fetchall()
+
+    def claim(self, data_set: int, owner: str, limit: int, lease_seconds: float,
+              statuses: tuple[str, ...] = ("pending", "failed"), since: float = 0.0,
+              shard: tuple[int, int] | None = None) -> list[tuple[str, str]]:
+        """以租约认领一批待下载的链接，返回 (folder, url)。
+        pending 总可认领，其余状态只认领 since 之前更新过的（每次运行最多处理一次）；
+        已被其他进程认领且租约未过期的跳过，进程退出后租约过期即可被重新认领"""
+        self.flush()
+        now = time.time()
+        others = [status for status in statuses if status != "pending"]
+        where = ["data_set = ?", "(lease_expires IS NULL OR lease_expires < ?)"]
+        params: list = [data_set, now]
+        status_clause = "status = 'pending'" if "pending" in statuses else "0"
+        if others:
+            status_clause += f" OR (status IN ({','.join('?' * len(others))}) AND updated_at < ?)"
+            params += [*others, since]
+        where.append(f"({status_clause})")
+        if shard is not None:
+            where.append("shard_of(url, ?) = ?")
+            params += [shard[1], shard[0]]
+        with self._lock:
+            try:
+                self.conn.execute("BEGIN IMMEDIATE")
+                rows = self.conn.execute(
+                    # 已勘测大小的链接按从大到小认领，未勘测的按登记顺序排在最后
+                    f"SELECT rowid, folder, url FROM downloads WHERE {' AND '.join(where)} "
+                    "ORDER BY expected_size IS NULL, expected_size DESC, rowid LIMIT ?",
+                    (*params, limit)).fetchall()
+                self.conn.executemany("UPDATE downloads SET lease_owner = ?, lease_expires = ? WHERE rowid = ?",
+                                      [(owner, now + lease_seconds, rowid) for rowid, _, _ in rows])
+                self.conn.commit()
+            except BaseException:
+                self.conn.rollback()
+                raise
+        return [(folder, url) for _, folder, url in rows]
+
+    def record_plan(self, data_set: int, results: list[tuple[str, int | None, str | None]]):
+        """写入大小勘测结果 (url, 大小, ETag)，未获取到大小的保留上次的结果"""
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "UPDATE downloads SET expected_size = COALESCE(?, expected_size), etag = COALESCE(?, etag), planned_at = ? "
+                "WHERE data_set = ? AND url = ?",
+                [(size, etag, now, data_set, url) for url, size, etag in results])
+
+    def expected_sizes(self, data_set: int) -> dict[str, int]:
+        """已勘测的 {url: 预估大小}"""
+        with self._lock:
+            return dict(self.conn.execute(
+                "SELECT url, expected_size FROM downloads WHERE data_set = ? AND expected_size IS NOT NULL",
+                (data_set,)).fetchall())
+
+    def verify_rows(self, data_set: int) -> list[tuple[str, str, int | None]]:
+        """已下载成功的链接，返回 (folder, url, 预期大小)；有勘测大小时以其为准，否则为下载时记录的字节数"""
+        self.flush()
+        with self._lock:
+            return self.conn.execute(
+                "SELECT folder, url, COALESCE(expected_size, NULLIF(bytes, 0)) FROM downloads "
+                "WHERE data_set = ? AND status = 'success' ORDER BY rowid", (data_set,)).fetchall()
+
+    def forget_file(self, path: str, url: str):
+        """校验不通过的文件从完整性索引与URL→blob索引中移除，下次运行不再离线跳过或从存储链接"""
+        self.flush()
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM completed WHERE path = ?", (path,))
+            self.conn.execute("DELETE FROM blobs WHERE url = ?", (url,))
+
+    def leased_by_others(self, data_set: int, owner: str) -> int:
+        """其他进程持有且未过期的租约数"""
+        with self._lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM downloads WHERE data_set = ? AND lease_owner != ? AND lease_expires >= ?",
+                (data_set, owner, time.time())).fetchone()[0]
+
+    def renew(self, owner: str, lease_seconds: float):
+        """延长该进程持有的所有租约"""
+        with self._lock, self.conn:
+            self.conn.execute("UPDATE downloads SET lease_expires = ? WHERE lease_owner = ?",
+                              (time.time() + lease_seconds, owner))
+
+    def release(self, owner: str):
+        """释放该进程仍持有的租约（如中断时未完成的链接）"""
+        self.flush()
+        with self._lock, self.conn:
+            self.conn.execute("UPDATE downloads SET lease_owner = NULL, lease_expires = NULL WHERE lease_owner = ?",
+                              (owner,))
+
+    def record(self, data_set: int, url: str, status: str, size: int = 0, error: str = "", attempted: bool = True):
+        """缓存一条下载结果，达到批量大小或间隔时间后统一提交；attempted为False时不计入尝试次数"""
+        with self._lock:
+            self._buffer.append((status, size, int(attempted), error or None, time.time(), data_set, url))
+            self._maybe_flush()
+
+    def mark_complete(self, path: str, url: str, size: int, etag: str | None = None):
+        """记录已完整下载文件的本地路径与大小，供下次运行离线跳过"""
+        with self._lock:
+            self._complete_buffer.append((path, url, size, etag, time.time()))
+            self._maybe_flush()
+
+    def completed_sizes(self) -> dict[str, int]:
+        """返回完整性索引 {本地路径: 文件大小}"""
+        self.flush()
+        with self._lock:
+            return dict(self.conn.execute("SELECT path, size FROM completed").fetchall())
+
+    def completed_after(self, rowid: int) -> tuple[dict[str, int], int]:
+        """增量读取完整性索引：返回 rowid 之后写入（含其他进程写入）的 {本地路径: 文件大小} 与最新的 rowid"""
+        self.flush()
+        with self._lock:
+            rows = self.conn.execute("SELECT rowid, path, size FROM completed WHERE rowid > ? ORDER BY rowid",
+                                     (rowid,)).fetchall()
+        return {path: size for _, path, size in rows}, (rows[-1][0] if rows else rowid)
+
+    def _maybe_flush(self):
+        if (len(self._buffer) + len(self._complete_buffer) >= self.batch_size
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """在一个事务中写入缓存的下载结果"""
+        with self._lock:
+            if self._buffer or self._complete_buffer:
+                with self.conn:
+                    self.conn.executemany(
+                        "UPDATE downloads SET status = ?, bytes = ?, attempts = attempts + ?, last_error = ?, updated_at = ?, "
+                        "lease_owner = NULL, lease_expires = NULL WHERE data_set = ? AND url = ?", self._buffer)
+                    self.conn.executemany(
+                        "INSERT OR REPLACE INTO completed (path, url, size, etag, updated_at) VALUES (?, ?, ?, ?, ?)",
+                        self._complete_buffer)
+                self._buffer.clear()
+                self._complete_buffer.clear()
+            self._last_flush = time.monotonic()
+
+    def export_json(self, data_set: int) -> dict[str, dict[str, str]]:
+        """导出为 downloads_status.json 的原有格式 {文件夹: {url: 状态}}"""
+        self.flush()
+        report: dict[str, dict[str, str]] = {}
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT folder, url, status, last_error FROM downloads WHERE data_set = ? ORDER BY CAST(page AS INTEGER), rowid",
+                (data_set,)).fetchall()
+            duplicates = self.conn.execute("SELECT folder, url FROM duplicates WHERE data_set = ? ORDER BY rowid",
+                                           (data_set,)).fetchall()
+        for folder, url, status, last_error in rows:
+            statuses = report.setdefault(folder, {})
+            if status == "success":
+                statuses[url] = "success"
+            elif status == "failed":
+                statuses[url] = f"failed: {last_error or ''}"
+        for folder, url in duplicates:
+            report.setdefault(folder, {})[url] = "skipped (duplicate)"
+        return report
+
+    def import_json(self, data_set: int, report: dict[str, dict[str, str]]):
+        """导入旧版 downloads_status.json，用于从JSON状态文件迁移"""
+        for folder, status_dict in report.items():
+            page = folder.rsplit("page_", 1)[-1]
+            self.register(data_set, page, folder, [url for url, status in status_dict.items()
+                                                   if not str(status).startswith("skipped")])
+            for url, status in status_dict.items():
+                status = str(status)
+                if status.startswith("skipped"):
+                    with self._lock, self.conn:
+                        self.conn.execute("INSERT OR IGNORE INTO duplicates (data_set, folder, url) VALUES (?, ?, ?)",
+                                          (data_set, folder, url))
+                elif status == "success":
+                    self.record(data_set, url, "success")
+                else:
+                    self.record(data_set, url, "failed", error=status.removeprefix("failed: "))
+        self.flush()
+
+    def blob_for_url(self, url: str) -> tuple[str, int] | None:
+        """查询URL对应的 (sha256, size)"""
+        with self._lock:
+            return self.conn.execute("SELECT sha256, size FROM blobs WHERE url = ?", (url,)).fetchone()
+
+    def record_blob(self, url: str, sha256: str, size: int):
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO blobs (url, sha256, size, updated_at) VALUES (?, ?, ?, ?)",
+                              (url, sha256, size, time.time()))
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            self.conn.close()
@@ -0,0 +1,145 @@
+import json
+import os
+import re
+from pathlib import Path
+from .segmented import IncompleteDownloadError, segment_state_path
+
+_CONTENT_RANGE_RE = re.compile(r"bytes (\d+)-(\d+)/(\d+|\*)")
+
+def part_path(file_path: Path) -> Path:
+    """下载中的临时文件，校验完成后才重命名为最终文件名"""
+    return file_path.with_name(file_path.name + ".part")
+
+def part_state_path(file_path: Path) -> Path:
+    """.part 文件的旁路进度文件，记录校验值(ETag/Last-Modified)、总大小与已写入偏移"""
+    return file_path.with_name(file_path.name + ".part.json")
+
+class PartFile:
+    """断点续传的 .part 文件：写入临时文件并定期保存进度，大小校验通过后原子重命名到最终路径；
+    续传时以 If-Range 携带上次的校验值，服务器内容变化时返回完整文件并从头写入"""
+    def __init__(self, url: str, file_path: Path, save_interval: int = 4 * 1024 * 1024):
+        self.url = url
+        self.file_path = file_path
+        self.path = part_path(file_path)
+        self.state_path = part_state_path(file_path)
+        self.save_interval = save_interval
+        self._unsaved = 0
+        self.adopt_legacy()
+        self.state = self._load_state()
+        self.reconcile()
+
+    def adopt_legacy(self):
+        """旧版本直接写入最终文件名的未完成文件（含分段下载进度）移入 .part 继续续传"""
+        if self.path.exists() or not self.file_path.exists():
+            return
+        legacy_segments = segment_state_path(self.file_path)
+        if legacy_segments.exists():
+            os.replace(legacy_segments, segment_state_path(self.path))
+        os.replace(self.file_path, self.path)
+
+    def reconcile(self):
+        """续传前用进度文件记录的偏移核对 .part：比记录的短（被截断或替换）时丢弃重下，
+        比记录的长（上次保存进度后进程崩溃，末尾可能未完整落盘）时截断到记录的偏移；
+        分段下载的 .part 已预分配到完整大小，由分段进度文件负责"""
+        saved = self.state.get("offset")
+        if saved is None or segment_state_path(self.path).exists():
+            return
+        size = self.offset
+        if size < saved:
+            self.reset()
+        elif size > saved:
+            with open(self.path, "r+b") as f:
+                f.truncate(saved)
+
+    def _load_state(self) -> dict:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return {"url": self.url}
+        return state if state.get("url") == self.url else {"url": self.url}
+
+    def save(self):
+        """原子写入进度文件"""
+        self.state["offset"] = self.offset
+        tmp = self.state_path.with_name(self.state_path.name + ".tmp")
+        tmp.write_text(json.dumps(self.state), encoding="utf-8")
+        tmp.replace(self.state_path)
+        self._unsaved = 0
+
+    @property
+    def offset(self) -> int:
+        """已写入 .part 的字节数"""
+        try:
+            return self.path.stat().st_size
+        except OSError:
+            return 0
+
+    @property
+    def total(self) -> int | None:
+        return self.state.get("size")
+
+    def resume_headers(self) -> dict[str, str]:
+        """续传请求头：Range 从已写入偏移开始，If-Range 携带强ETag或Last-Modified"""
+        offset = self.offset
+        if offset <= 0:
+            return {}
+        headers = {"Range": f"bytes={offset}-"}
+        etag = self.state.get("etag")
+        validator = etag if etag and not etag.startswith("W/") else self.state.get("last_modified")
+        if validator:
+            headers["If-Range"] = validator
+        return headers
+
+    def begin(self, status_code: int, headers, content_length: int) -> bool:
+        """根据响应确定续传或重新写入，记录校验值与总大小；返回是否追加写入"""
+        offset = self.offset
+        append = status_code == 206 and offset > 0
+        total = offset + content_length if append else content_length
+        if append:
+            match = _CONTENT_RANGE_RE.fullmatch(headers.get("Content-Range", ""))
+            if match and int(match.group(1)) != offset:
+                self.reset()
+                raise IncompleteDownloadError(f"(服务器返回的分段起点 {match.group(1)} 与已下载 {offset} bytes 不一致)")
+            if match and match.group(3) != "*":
+                total = int(match.group(3))
+        self.state = {
+            "url": self.url,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "size": total or None,
+        }
+        if not append:
+            self.path.unlink(missing_ok=True)
+        self.save()
+        return append
+
+    def advance(self, nbytes: int, f):
+        """记录写入的字节，每 save_interval 字节刷新文件并保存一次进度"""
+        self._unsaved += nbytes
+        if self._unsaved >= self.save_interval:
+            f.flush()
+            self.save()
+
+    def range_satisfied(self) -> bool:
+        """416 时判断 .part 是否已完整：按记录的总大小校验；总大小未知时无法判断，视为不完整（丢弃后从头下载）"""
+        total = self.total
+        return total is not None and self.offset == total
+
+    def verify(self):
+        """校验 .part 大小与记录的总大小一致"""
+        total, offset = self.total, self.offset
+        if total and offset != total:
+            raise IncompleteDownloadError(f"(已下载 {offset} bytes , 剩余{total - offset}bytes未下载完成)")
+
+    def commit(self):
+        """校验通过后原子重命名为最终文件，并删除进度文件"""
+        self.verify()
+        os.replace(self.path, self.file_path)
+        self.state_path.unlink(missing_ok=True)
+
+    def reset(self):
+        """丢弃 .part 与进度，下次从头下载"""
+        self.path.unlink(missing_ok=True)
+        self.state_path.unlink(missing_ok=True)
+        self.state = {"url": self.url}
@@ -0,0 +1,70 @@
+import re
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from requests import Session
+from src.transport import RetryPolicy, parse_retry_after
+from src.utils import RateLimiter
+
+_CONTENT_RANGE_TOTAL_RE = re.compile(r"bytes \d+-\d+/(\d+)")
+
+def largest_first(tasks: list[tuple[str, str, Path]], sizes: dict[str, int]) -> list[tuple[str, str, Path]]:
+    """按预估大小从大到小排列下载任务（LPT）：大文件先占满各线程，小文件在最后填补空隙，
+    避免最后只剩一个线程在下载大文件；未勘测大小的任务保持原顺序排在最后"""
+    known = [task for task in tasks if sizes.get(task[1]) is not None]
+    unknown = [task for task in tasks if sizes.get(task[1]) is None]
+    return sorted(known, key=lambda task: sizes[task[1]], reverse=True) + unknown
+
+def free_space(path: Path) -> int:
+    """path 所在磁盘的可用字节数，path 尚不存在时向上查找已存在的目录"""
+    path = Path(path)
+    while not path.exists() and path != path.parent:
+        path = path.parent
+    return shutil.disk_usage(path).free
+
+class SizeSurvey:
+    """下载前的大小勘测：限速并发发送HEAD请求，读取 Content-Length 与 ETag；
+    服务器不支持HEAD或未返回长度时改用 Range: bytes=0-0 的GET从 Content-Range 读取总大小"""
+    def __init__(self, session: Session, max_workers: int = 16, rate_limit: float = 20.0,
+                 max_retry_times: int = 3, retry_policy: RetryPolicy | None = None):
+        self.session = session
+        self.max_workers = max_workers
+        self.rate_limiter = RateLimiter(rate_limit)
+        self.max_retry_times = max_retry_times
+        self.retry_policy = retry_policy or RetryPolicy()
+
+    def probe(self, url: str) -> tuple[int | None, str | None]:
+        """返回 (大小, ETag)，无法获取大小时大小为None"""
+        self.rate_limiter.wait()
+        resp = self.session.head(url, allow_redirects=True)
+        resp.close()
+        if resp.ok and resp.headers.get("Content-Length") and not resp.headers.get("Content-Encoding"):
+            return int(resp.headers["Content-Length"]), resp.headers.get("ETag")
+        if resp.status_code in (403, 429):
+            resp.raise_for_status()
+        self.rate_limiter.wait()
+        resp = self.session.get(url, headers={"Range": "bytes=0-0"}, stream=True)
+        resp.close()
+        resp.raise_for_status()
+        match = _CONTENT_RANGE_TOTAL_RE.fullmatch(resp.headers.get("Content-Range", ""))
+        if match:
+            return int(match.group(1)), resp.headers.get("ETag")
+        length = resp.headers.get("Content-Length")
+        return (int(length) if resp.status_code == 200 and length else None), resp.headers.get("ETag")
+
+    def probe_with_retry(self, url: str) -> tuple[str, int | None, str | None]:
+        for retry_time in range(1, self.max_retry_times + 1):
+            try:
+                return (url, *self.probe(url))
+            except Exception as e:
+                if retry_time == self.max_retry_times:
+                    return url, None, None
+                response = getattr(e, "response", None)
+                retry_after = parse_retry_after(response.headers.get("Retry-After")) if response is not None else None
+                self.retry_policy.sleep(retry_time, retry_after)
+        return url, None, None
+
+    def run(self, urls: list[str]) -> list[tuple[str, int | None, str | None]]:
+        """勘测全部URL，返回 (url, 大小, ETag)"""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(self.probe_with_retry, urls))
@@ -0,0 +1,132 @@
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from requests import Session
+from src.transport import RetryPolicy
+
+class IncompleteDownloadError(IOError):
+    """写入的字节数少于 Content-Length（连接中断或响应被截断）"""
+
+def segment_state_path(file_path: Path) -> Path:
+    """分段下载进度的旁路文件"""
+    return file_path.with_name(file_path.name + ".segments.json")
+
+def remaining_segment_bytes(file_path: Path) -> int | None:
+    """按分段进度文件计算尚未下载的字节数（预分配的文件大小不代表已下载），没有有效进度时返回None"""
+    try:
+        with open(segment_state_path(file_path), "r", encoding="utf-8") as f:
+            segments = json.load(f)["segments"]
+        return sum(max(0, end + 1 - start - done) for start, end, done in segments)
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+class SegmentedDownload:
+    """将大文件按字节范围切分，多连接并发写入预分配文件的对应偏移，每段独立续传"""
+    def __init__(self, session: Session, url: str, file_path: Path, total: int,
+                 segments: int = 4, max_retry_times: int = 3, logger: logging.Logger | None = None,
+                 save_interval: int = 4 * 1024 * 1024, retry_policy: RetryPolicy | None = None):
+        self.session = session
+        self.url = url
+        self.file_path = file_path
+        self.total = total
+        self.max_retry_times = max_retry_times
+        self.logger = logger or logging.getLogger(__name__)
+        self.save_interval = save_interval
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.state_path = segment_state_path(file_path)
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self.state = self._load_state() or self._new_state(segments)
+
+    def _new_state(self, segments: int) -> dict:
+        step = -(-self.total // segments)
+        ranges = [[start, min(start + step, self.total) - 1, 0] for start in range(0, self.total, step)]
+        return {"url": self.url, "size": self.total, "segments": ranges}
+
+    def _load_state(self) -> dict | None:
+        """读取已有进度，URL或大小不一致时视为无效"""
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state.get("url") != self.url or state.get("size") != self.total:
+            return None
+        if not self.file_path.exists() or self.file_path.stat().st_size != self.total:
+            return None
+        return state
+
+    def _save_state(self):
+        with self._save_lock:
+            with self._lock:
+                data = json.dumps(self.state)
+            tmp = self.state_path.with_name(self.state_path.name + ".tmp")
+            tmp.write_text(data, encoding="utf-8")
+            tmp.replace(self.state_path)
+
+    def _preallocate(self):
+        if self.file_path.exists() and self.file_path.stat().st_size == self.total and self.state_path.exists():
+            return
+        # 先写进度文件再预分配：预分配后崩溃时按分段进度续传，不会把全零的文件当作已下载完整
+        self._save_state()
+        self.file_path.unlink(missing_ok=True)
+        with open(self.file_path, "wb") as f:
+            f.truncate(self.total)
+
+    def _fetch_segment(self, segment: list[int]):
+        """下载单个分段，失败时从该段已写入的位置继续"""
+        start, end, _ = segment
+        reason = ""
+        for retry_time in range(1, self.max_retry_times + 1):
+            offset = start + segment[2]
+            if offset > end:
+                return
+            try:
+                resp = self.session.get(self.url, stream=True, headers={"Range": f"bytes={offset}-{end}"})
+                resp.raise_for_status()
+                if resp.status_code != 206:
+                    raise IOError(f"服务器未按Range返回分段 (http {resp.status_code})")
+                unsaved = 0
+                with open(self.file_path, "r+b") as f:
+                    f.seek(offset)
+                    for chunk in resp.iter_content(chunk_size=1024 * 256):
+                        if not chunk:
+                            continue
+                        f.write(chunk)
+                        with self._lock:
+                            segment[2] += len(chunk)
+                        unsaved += len(chunk)
+                        if unsaved >= self.save_interval:
+                            f.flush()
+                            self._save_state()
+                            unsaved = 0
+                self._save_state()
+                if start + segment[2] != end + 1:
+                    raise IOError(f"(分段 {start}-{end} 已下载 {segment[2]} bytes , 剩余{end + 1 - start - segment[2]}bytes未下载完成)")
+                return
+            except Exception as e:
+                reason = str(e)
+                self.logger.warning(f"分段重试第{retry_time}次/总{self.max_retry_times}次失败 : {self.url} [{start}-{end}]: {reason}")
+                self._save_state()
+                self.retry_policy.sleep(retry_time)
+        raise IOError(f"分段 {start}-{end} 下载失败: {reason}")
+
+    def run(self):
+        """并发下载所有未完成的分段，全部完成后校验总大小并删除进度文件"""
+        self._preallocate()
+        pending = [segment for segment in self.state["segments"] if segment[0] + segment[2] <= segment[1]]
+        errors = []
+        with ThreadPoolExecutor(max_workers=max(1, len(pending))) as executor:
+            for future in [executor.submit(self._fetch_segment, segment) for segment in pending]:
+                try:
+                    future.result()
+                except Exception as e:
+                    errors.append(str(e))
+        if errors:
+            raise IOError(", ".join(errors))
+        bytes_written = sum(segment[2] for segment in self.state["segments"])
+        if bytes_written != self.total or self.file_path.stat().st_size != self.total:
+            raise IncompleteDownloadError(f"(已下载 {bytes_written} bytes , 剩余{self.total - bytes_written}bytes未下载完成)")
+        self.state_path.unlink(missing_ok=True)
@@ -0,0 +1,66 @@
+import hashlib
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+PDF_MAGIC = b"%PDF-"
+PDF_EOF = b"%%EOF"
+# PDF 规范允许文件头出现在前1024字节内、%%EOF 出现在最后1024字节内
+_HEAD = 1024
+_TAIL = 1024
+
+def is_pdf(url: str) -> bool:
+    return url.lower().endswith(".pdf")
+
+def check_pdf(path: str, offset: int = 0, size: int | None = None, expected_size: int | None = None,
+              want_hash: bool = False, pdf: bool = True) -> tuple[str, int, str | None]:
+    """以 mmap 读取文件（或归档分片中 offset 起 size 字节的成员）的头尾检查PDF完整性，
+    返回 (问题, 实际大小, sha256)；问题为空字符串表示通过：
+    missing / empty / html（年龄验证页等HTML） / not_pdf / size_mismatch / no_eof；
+    pdf 为False时（mp4、xlsx等非PDF文件）只检查是否为HTML与大小，不检查文件头与 %%EOF"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return "missing", 0, None
+    try:
+        file_size = os.fstat(fd).st_size
+        if size is None:
+            size = file_size - offset
+        if size <= 0:
+            return "empty", 0, None
+        if offset + size > file_size:
+            return "size_mismatch", max(0, file_size - offset), None
+        with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+            head = mm[offset:offset + min(size, _HEAD)]
+            tail = mm[offset + max(0, size - _TAIL):offset + size]
+            digest = None
+            if want_hash:
+                # 通过 memoryview 直接对映射区计算哈希，不复制文件内容
+                hasher = hashlib.sha256()
+                with memoryview(mm) as view:
+                    hasher.update(view[offset:offset + size])
+                digest = hasher.hexdigest()
+    finally:
+        os.close(fd)
+    if not pdf:
+        if head.lstrip().lower().startswith((b"<!doctype html", b"<html")):
+            return "html", size, digest
+    elif PDF_MAGIC not in head:
+        return ("html" if head.lstrip().startswith(b"<") else "not_pdf"), size, digest
+    if expected_size and size != expected_size:
+        return "size_mismatch", size, digest
+    if pdf and PDF_EOF not in tail:
+        return "no_eof", size, digest
+    return "", size, digest
+
+def _check_batch(batch: list[tuple]) -> list[tuple[str, int, str | None]]:
+    return [check_pdf(*args) for args in batch]
+
+def verify_files(tasks: list[tuple], max_workers: int | None = None, batch_size: int = 512) -> list[tuple[str, int, str | None]]:
+    """在进程池中并行检查，tasks 为 check_pdf 的参数元组，结果与 tasks 顺序一致；
+    按批提交以减少进程间通信，文件较少时直接在当前进程检查"""
+    if len(tasks) <= batch_size or max_workers == 1:
+        return _check_batch(tasks)
+    batches = [tasks[i:i + batch_size] for i in range(0, len(tasks), batch_size)]
+    with ProcessPoolExecutor(max_workers=max_workers or None) as executor:
+        return [result for results in executor.map(_check_batch, batches) for result in results]
@@ -0,0 +1,26 @@
+import json
+from pathlib import Path
+from .registry import MetricsRegistry, Histogram
+from .exporter import MetricsServer, SnapshotWriter
+
+metrics = MetricsRegistry()
+
+def start_exporters(port: int = 0, snapshot_path: str|Path|None = None, snapshot_interval: float = 10.0) -> list:
+    """按配置启动实时指标端点和定期快照，返回已启动的导出器"""
+    exporters = []
+    if port:
+        exporters.append(MetricsServer(metrics, port).start())
+    if snapshot_path:
+        exporters.append(SnapshotWriter(metrics, snapshot_path, snapshot_interval).start())
+    return exporters
+
+def write_summary(path: str|Path) -> dict:
+    """写出本次运行的汇总"""
+    summary = metrics.summary()
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    return summary
+
+__all__ = ["metrics", "MetricsRegistry", "Histogram", "MetricsServer", "SnapshotWriter",
+           "start_exporters", "write_summary"]
@@ -0,0 +1,74 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from .registry import MetricsRegistry
+
+class MetricsServer:
+    """以 Prometheus 文本格式提供 /metrics，/metrics.json 提供JSON快照"""
+    def __init__(self, registry: MetricsRegistry, port: int, host: str = "127.0.0.1"):
+        self.registry = registry
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="metrics-server", daemon=True)
+
+    def _handler_class(self):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.startswith("/metrics.json"):
+                    body = json.dumps(registry.snapshot(), ensure_ascii=False).encode("utf-8")
+                    content_type = "application/json"
+                elif self.path.startswith("/metrics"):
+                    body = registry.render_prometheus().encode("utf-8")
+                    content_type = "text/plain; version=0.0.4"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def start(self) -> "MetricsServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+class SnapshotWriter:
+    """后台线程定期将JSON快照写入文件（先写临时文件再替换）"""
+    def __init__(self, registry: MetricsRegistry, path: str|Path, interval: float = 10.0):
+        self.registry = registry
+        self.path = Path(path)
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-snapshot", daemon=True)
+
+    def write(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(self.registry.snapshot(), ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp.replace(self.path)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def start(self) -> "SnapshotWriter":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.write()
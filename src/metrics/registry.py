@@ -0,0 +1,140 @@
+import bisect
+import threading
+import time
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+class Histogram:
+    """固定分桶的直方图"""
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float | None:
+        """按分桶上界估算分位数"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+def _labels_key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _format_labels(key: tuple, extra: dict | None = None) -> str:
+    items = list(key) + sorted((extra or {}).items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+class MetricsRegistry:
+    """进程内的指标登记：计数器、仪表、直方图，可导出 Prometheus 文本、JSON 快照与运行汇总"""
+    def __init__(self, prefix: str = "epstein_"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.counters: dict[str, dict[tuple, float]] = {}
+        self.gauges: dict[str, dict[tuple, float]] = {}
+        self.histograms: dict[str, dict[tuple, Histogram]] = {}
+        self.started = time.time()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _labels_key(labels)
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self.gauges.setdefault(name, {})[_labels_key(labels)] = value
+
+    def add(self, name: str, value: float, **labels):
+        """仪表增减（如在途任务数）"""
+        key = _labels_key(labels)
+        with self._lock:
+            series = self.gauges.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, buckets: tuple[float, ...] = LATENCY_BUCKETS, **labels):
+        key = _labels_key(labels)
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = Histogram(buckets)
+            series[key].observe(value)
+
+    def total(self, name: str) -> float:
+        """计数器所有标签的合计"""
+        with self._lock:
+            return sum(self.counters.get(name, {}).values())
+
+    def render_prometheus(self) -> str:
+        """导出为 Prometheus 文本格式"""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self.counters.items()):
+                lines.append(f"# TYPE {self.prefix}{name} counter")
+                lines.extend(f"{self.prefix}{name}{_format_labels(key)} {value}" for key, value in series.items())
+            for name, series in sorted(self.gauges.items()):
+                lines.append(f"# TYPE {self.prefix}{name} gauge")
+                lines.extend(f"{self.prefix}{name}{_format_labels(key)} {value}" for key, value in series.items())
+            for name, series in sorted(self.histograms.items()):
+                lines.append(f"# TYPE {self.prefix}{name} histogram")
+                for key, hist in series.items():
+                    cumulative = 0
+                    for bound, count in zip(hist.buckets + (float("inf"),), hist.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f"{self.prefix}{name}_bucket{_format_labels(key, {'le': le})} {cumulative}")
+                    lines.append(f"{self.prefix}{name}_sum{_format_labels(key)} {hist.sum}")
+                    lines.append(f"{self.prefix}{name}_count{_format_labels(key)} {hist.count}")
+        lines.append(f"# TYPE {self.prefix}uptime_seconds gauge")
+        lines.append(f"{self.prefix}uptime_seconds {time.time() - self.started:.3f}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        """当前指标的JSON快照"""
+        def series_dict(series: dict, value=lambda v: v) -> dict:
+            return {(",".join(f"{k}={v}" for k, v in key) or "total"): value(item) for key, item in series.items()}
+
+        with self._lock:
+            elapsed = max(time.time() - self.started, 1e-6)
+            bytes_total = sum(self.counters.get("download_bytes_total", {}).values())
+            return {
+                "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "elapsed_seconds": round(elapsed, 3),
+                "bytes_per_second": round(bytes_total / elapsed, 1),
+                "counters": {name: series_dict(series) for name, series in self.counters.items()},
+                "gauges": {name: series_dict(series) for name, series in self.gauges.items()},
+                "histograms": {name: series_dict(series, lambda h: {
+                    "count": h.count,
+                    "mean": round(h.sum / h.count, 4) if h.count else None,
+                    "p50": h.quantile(0.5),
+                    "p95": h.quantile(0.95),
+                    "p99": h.quantile(0.99),
+                }) for name, series in self.histograms.items()},
+            }
+
+    def summary(self) -> dict:
+        """运行汇总：耗时、吞吐、结果与重试原因"""
+        snapshot = self.snapshot()
+        counters = snapshot["counters"]
+        return {
+            "elapsed_seconds": snapshot["elapsed_seconds"],
+            "bytes_per_second": snapshot["bytes_per_second"],
+            "downloads": counters.get("downloads_total", {}),
+            "download_bytes": sum(counters.get("download_bytes_total", {}).values()),
+            "retries": counters.get("download_retries_total", {}),
+            "page_requests": counters.get("page_requests_total", {}),
+            "latency": snapshot["histograms"],
+        }
@@ -1,4 +1,6 @@
 from .check_repeat import check_repeats
 from .pagedownloader import PageDownloader
+from .extractor import LinkExtractor, PageScan, FileLink, DuplicateCounter
+from .checkpoint import CrawlCheckpoint, checkpoint_path, iter_page_links, iter_data_set_links
 
-__all__ = ["PageDownloader","check_repeats",]
\ No newline at end of file
+__all__ = ["PageDownloader","check_repeats","CrawlCheckpoint","checkpoint_path","iter_page_links","iter_data_set_links","LinkExtractor","PageScan","FileLink","DuplicateCounter",]
\ No newline at end of file
@@ -1,13 +1,16 @@
 import json
+from pathlib import Path
 from src.config import PAGE_DIR
+from .extractor import DuplicateCounter
 from .pagedownloader import logger
 
-def check_repeats(id:int):
-    with open(PAGE_DIR / f"data-set-{id}/dataset{id}_file_links.json","r") as f:
-        data:dict[str:list[str]] = json.load(f)
-    all_value_list = []
+def check_repeats(id:int, page_dir:str|Path = PAGE_DIR) -> DuplicateCounter:
+    """以集合逐页统计数据集链接JSON中的重复链接，不构建完整的链接列表"""
+    with open(Path(page_dir) / f"data-set-{id}/dataset{id}_file_links.json","r") as f:
+        data:dict[str, list[str]] = json.load(f)
+    counter = DuplicateCounter()
     for new_links in data.values():
-        for new_link in new_links:
-            all_value_list.append(new_link)
-    logger.info(f"总链接数{len(all_value_list)}, 去重后链接数{len(set(all_value_list))}, 重复链接数{len(all_value_list)-len(set(all_value_list))}")
+        counter.add(new_links)
+    logger.info(f"总链接数{counter.total}, 去重后链接数{counter.unique}, 重复链接数{counter.duplicates}")
     logger.info("重复链接在下载中将跳过")
+    return counter
@@ -0,0 +1,87 @@
+import json
+import threading
+from pathlib import Path
+from typing import Iterator
+
+def checkpoint_path(output_dir: str|Path, data_set_number: int) -> Path:
+    """数据集的流式链接检查点文件（NDJSON，每行一页）"""
+    return Path(output_dir) / f"dataset{data_set_number}_file_links.ndjson"
+
+def iter_page_links(path: str|Path) -> Iterator[tuple[int, list[str]]]:
+    """逐行读取检查点，产出 (页码, 链接)；同一页出现多次时以最后一次为准由调用方处理，末尾未写完的行忽略"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if "page" in record:
+                yield int(record["page"]), record.get("links", [])
+
+def iter_data_set_links(page_dir: str|Path, data_set_number: int) -> Iterator[tuple[int|str, list[str]]] | None:
+    """逐页读取数据集的链接：优先逐行读取爬取检查点(NDJSON)，没有时读取链接JSON；都不存在时返回None"""
+    data_set_dir = Path(page_dir) / f"data-set-{data_set_number}"
+    ndjson_path = checkpoint_path(data_set_dir, data_set_number)
+    if ndjson_path.exists():
+        return iter_page_links(ndjson_path)
+    try:
+        with open(data_set_dir / f"dataset{data_set_number}_file_links.json", 'r') as f:
+            data: dict[str, list[str]] = json.load(f)
+    except FileNotFoundError:
+        return None
+    return iter(data.items())
+
+class CrawlCheckpoint:
+    """爬取检查点：每爬完一页就追加一行 {"page", "links"}，正常结束时追加 {"done": true}；
+    进程中断后下次运行读取已完成的页并从断点继续"""
+    def __init__(self, path: str|Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._file = None
+
+    def load(self) -> tuple[dict[int, list[str]], bool]:
+        """读取已完成的页与是否已正常结束，文件不存在时返回空"""
+        pages: dict[int, list[str]] = {}
+        done = False
+        if not self.path.exists():
+            return pages, done
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("done"):
+                    done = True
+                elif "page" in record:
+                    pages[int(record["page"])] = record.get("links", [])
+        return pages, done
+
+    def open(self, resume: bool):
+        """打开检查点：续爬时追加，否则清空重写"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a" if resume else "w", encoding="utf-8")
+        if resume and self._file.tell() > 0:
+            with open(self.path, "rb") as f:
+                f.seek(-1, 2)
+                if f.read(1) != b"\n":
+                    # 上次中断时最后一行未写完，换行后继续追加
+                    self._file.write("\n")
+
+    def append(self, page: int, links: list[str]):
+        """追加一页的链接并立即刷新到磁盘"""
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(json.dumps({"page": page, "links": links}) + "\n")
+            self._file.flush()
+
+    def close(self, done: bool):
+        """关闭检查点，done 为True时写入结束标记"""
+        with self._lock:
+            if self._file is None:
+                return
+            if done:
+                self._file.write(json.dumps({"done": True}) + "\n")
+            self._file.close()
+            self._file = None
@@ -0,0 +1,101 @@
+import re
+from typing import Iterable, Iterator, NamedTuple
+from urllib.parse import unquote
+
+DEFAULT_FILE_PATTERN = r'href="(https:\/\/[w]{3}\.justice\.gov\/epstein\/files\/DataSet[^"]+)"'
+DEFAULT_PAGER_PATTERN = r'href="[^"]*[?&;]page=(\d+)[^"]*"'
+
+class FileLink(NamedTuple):
+    """带元数据的文件链接：文件名（已解码）与在列表页中的位置（从0开始）"""
+    url: str
+    name: str
+    position: int
+
+class LinkExtractor:
+    """预编译的文件链接与分页器正则，可在多个线程间共享；爬取时整页用 extract()，
+    需要边接收边处理的大响应可通过 scan() 创建一次增量扫描"""
+    def __init__(self, pattern: str | None = None, pager_pattern: str | None = None, metadata: bool = False,
+                 overlap: int = 4096):
+        self.pattern = re.compile(pattern or DEFAULT_FILE_PATTERN)
+        self.pager_pattern = re.compile(pager_pattern or DEFAULT_PAGER_PATTERN)
+        self.metadata = metadata
+        self.overlap = overlap
+
+    def scan(self, pager: bool = False) -> "PageScan":
+        """创建一次页面扫描，pager 为True时同时读取分页器（只在需要末页页码时开启，分页器正则开销较大）"""
+        return PageScan(self, pager)
+
+    def extract(self, text: str) -> list:
+        """一次性提取整段文本中的链接"""
+        if not self.metadata:
+            return self.pattern.findall(text)
+        return list(self.scan().iter_chunks((text,)))
+
+    def find_last_page(self, text: str) -> int | None:
+        """从分页器中读取最后一页的页码，找不到分页器时返回None"""
+        pages = [int(page) for page in self.pager_pattern.findall(text)]
+        return max(pages) if pages else None
+
+class PageScan:
+    """单个列表页的增量扫描：响应体按块送入，链接随解析产出而不等待整页；
+    每块只保留末尾不超过 overlap 个字符与上一块拼接，跨块的链接不会丢失也不会重复（正则需以引号等定界符结尾）；
+    pager 为True时同时记录分页器中的最大页码"""
+    def __init__(self, extractor: LinkExtractor, pager: bool = False):
+        self.extractor = extractor
+        self.pager = pager
+        self.last_page: int | None = None
+        self.count = 0
+        self._tail = ""
+
+    def feed(self, chunk: str) -> Iterator[str | FileLink]:
+        buffer = self._tail + chunk
+        matches = list(self.extractor.pattern.finditer(buffer))
+        end = matches[-1].end() if matches else 0
+        group = 1 if self.extractor.pattern.groups else 0
+        if self.extractor.metadata:
+            yield from (self._link(match.group(group)) for match in matches)
+        else:
+            self.count += len(matches)
+            yield from [match.group(group) for match in matches]
+        if self.pager:
+            for page in self.extractor.pager_pattern.findall(buffer):
+                if self.last_page is None or int(page) > self.last_page:
+                    self.last_page = int(page)
+        self._tail = buffer[max(end, len(buffer) - self.extractor.overlap):]
+
+    def iter_chunks(self, chunks: Iterable[str]) -> Iterator[str | FileLink]:
+        for chunk in chunks:
+            yield from self.feed(chunk)
+        self._tail = ""
+
+    def _link(self, url: str) -> str | FileLink:
+        position = self.count
+        self.count += 1
+        if not self.extractor.metadata:
+            return url
+        return FileLink(url, unquote(url.rsplit("/", 1)[-1]), position)
+
+class DuplicateCounter:
+    """流式重复计数：逐页加入链接，只保留已见链接的集合，不构建完整列表"""
+    def __init__(self):
+        self.seen: set[str] = set()
+        self.total = 0
+
+    def add(self, links: Iterable[str]) -> int:
+        """加入一批链接，返回其中的重复数"""
+        duplicates = 0
+        for link in links:
+            self.total += 1
+            if link in self.seen:
+                duplicates += 1
+            else:
+                self.seen.add(link)
+        return duplicates
+
+    @property
+    def unique(self) -> int:
+        return len(self.seen)
+
+    @property
+    def duplicates(self) -> int:
+        return self.total - len(self.seen)
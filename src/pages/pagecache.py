@@ -0,0 +1,43 @@
+import json
+import threading
+from pathlib import Path
+
+class PageCache:
+    """列表页的条件请求缓存，按页码记录 ETag / Last-Modified 和链接摘要"""
+    def __init__(self, path: str|Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.pages: dict[str, dict[str, str]] = {}
+        self.last_page: int | None = None
+        if self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self.pages = data.get("pages", {})
+                self.last_page = data.get("last_page")
+            except (OSError, ValueError):
+                self.pages = {}
+
+    def get(self, page: int) -> dict[str, str] | None:
+        return self.pages.get(str(page))
+
+    def conditional_headers(self, page: int) -> dict[str, str]:
+        """根据缓存生成条件请求头"""
+        entry = self.get(page) or {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def update(self, page: int, etag: str | None, last_modified: str | None, digest: str):
+        with self._lock:
+            self.pages[str(page)] = {"etag": etag or "", "last_modified": last_modified or "", "hash": digest}
+
+    def save(self):
+        with self._lock:
+            data = {"last_page": self.last_page,
+                    "pages": dict(sorted(self.pages.items(), key=lambda item: int(item[0])))}
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4)
@@ -1,10 +1,17 @@
 from requests import Response, Session
-import re
+from requests.exceptions import HTTPError
 from src.config import init_logger, LOG_DIR
-import random
+from src.utils import RateLimiter
+from src.transport import RetryPolicy, parse_retry_after
+from src.metrics import metrics
+from .pagecache import PageCache
+from .checkpoint import CrawlCheckpoint, checkpoint_path
+from .extractor import LinkExtractor
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import time
 import json
 from pathlib import Path
+from typing import Callable
 import hashlib
 
 logger = init_logger('dataset_downloader', LOG_DIR / "page_analyze.log")
@@ -16,6 +23,13 @@ class PageDownloader:
                  max_retry_times:int=7,
                  max_repeat_pages:int=5,
                  pattern = None,
+                 pager_pattern:str|None = None,
+                 max_workers:int = 4,
+                 rate_limit:float = 3.0,
+                 incremental:bool = True,
+                 resume:bool = True,
+                 retry_policy:RetryPolicy|None = None,
+                 on_page:Callable[[int, list[str]], None]|None = None,
                  **kwargs
                  ):
         self.session = session
@@ -25,22 +39,28 @@ class PageDownloader:
         self.pattern = pattern
         self.max_retry_times = max_retry_times
         self.max_repeat_pages = max_repeat_pages
+        self.extractor = LinkExtractor(pattern, pager_pattern)
+        self.max_workers = max_workers
+        self.rate_limiter = RateLimiter(rate_limit)
+        self.incremental = incremental
+        self.resume = resume
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.on_page = on_page
         
         self.retry_times = 0
         self.failed_pages = []
         self.file_link_dict = {}       
+        self.previous_links: dict[int, list[str]] = {}
+        self.unchanged_pages: list[int] = []
+        self.page_cache: PageCache | None = None
+        self.checkpoint: CrawlCheckpoint | None = None
+        self.done_pages: set[int] = set()
     
     def random_sleep(self):
         """随机休眠"""
         # time.sleep(random.uniform(1, 6))
         time.sleep(0.3)
 
-    def backoff_sleep(self, attempt:int, base:float = 3.0, cap:float = 60.0):
-        """退避等待，指数休眠"""
-        delay = min(cap, base * (2 ** (attempt - 1)))
-        rd_delay = random.uniform(0, delay * 0.3)
-        time.sleep(delay + rd_delay)
-
     def _hash_links(self, links:list[str]) -> str:
         joined = "\n".join(links)
         return hashlib.sha256(joined.encode("utf-8")).hexdigest()
@@ -48,85 +68,212 @@ class PageDownloader:
     def warmup_session(self):
         """预热会话"""
         try:
-            resp = self.session.get(self.base_url, timeout=10)
+            resp = self.session.get(self.base_url)
             resp.cookies.update(self.session.cookies)
         except Exception:
             pass
         
-    def make_request(self,url:str, max_attempts:int = 3) -> Response | None:
-        """带重试地发送httpGET"""
+    def make_request(self,url:str, max_attempts:int = 3, headers:dict[str, str]|None = None) -> Response | None:
+        """带重试地发送httpGET，条件请求命中时返回304响应"""
         for attempt in range(1, max_attempts + 1):
             try:
-                resp = self.session.get(url, timeout=10)
+                resp = self.session.get(url, headers=headers)
+                metrics.observe("page_latency_seconds", resp.elapsed.total_seconds())
+                metrics.inc("page_requests_total", status=resp.status_code)
                 if resp.status_code in (403, 429):
                     logger.warning(f"{url} 返回 {resp.status_code}，第 {attempt}/{max_attempts} 次尝试，退避等待后重试。")
-                    self.backoff_sleep(attempt, base=5.0, cap=90.0)
+                    self.retry_policy.sleep(attempt, parse_retry_after(resp.headers.get("Retry-After")))
                     continue
                 resp.raise_for_status()
                 return resp
             except Exception as e:
+                if not isinstance(e, HTTPError):
+                    metrics.inc("page_requests_total", status="error")
                 logger.error(f"{url} 请求失败(第 {attempt}/{max_attempts} 次): {e}")
                 if attempt < max_attempts:
-                    self.backoff_sleep(attempt)
+                    self.retry_policy.sleep(attempt)
         return None
     
+    def add_page_links(self, page:int, file_links:list[str], checkpoint:bool = True):
+        """保存某页提取到的链接并追加到检查点，通知 on_page 回调（用于边爬边下载）"""
+        self.file_link_dict[page] = file_links
+        if checkpoint and self.checkpoint is not None:
+            self.checkpoint.append(page, file_links)
+        if self.on_page is not None:
+            self.on_page(page, file_links)
+
+    def request_page(self, page:int) -> tuple[list[str] | None, str | None]:
+        """请求单个页码并提取链接，返回 (链接, 页面文本)；请求失败时链接为None，命中缓存(304)时复用上次的链接且文本为None"""
+        previous = self.previous_links.get(page)
+        headers = self.page_cache.conditional_headers(page) if self.incremental and previous is not None else {}
+        resp = self.make_request(f"{self.data_set_url}?page={page}", headers=headers or None)
+        if resp is None:
+            return None, None
+        if resp.status_code == 304:
+            self.unchanged_pages.append(page)
+            return list(previous), None
+        # 列表页不大，整页一次 findall 比按块流式扫描快；未声明编码时按 UTF-8 解码，避免对整页做编码探测
+        resp.encoding = resp.encoding or "utf-8"
+        text = resp.text
+        file_links = self.re_findall_files(text)
+        digest = self._hash_links(file_links)
+        cached = self.page_cache.get(page)
+        if cached and cached.get("hash") == digest:
+            self.unchanged_pages.append(page)
+        self.page_cache.update(page, resp.headers.get("ETag"), resp.headers.get("Last-Modified"), digest)
+        return file_links, text
+
+    def find_last_page(self, text:str) -> int | None:
+        """从分页器中读取最后一页的页码，找不到分页器时返回None"""
+        return self.extractor.find_last_page(text)
+
     def re_findall_files(self,text:str)->list[str]:
-        """使用正则表达式提取文件链接"""
-        pattern = re.compile(self.pattern) if self.pattern else re.compile(r'href="(https:\/\/[w]{3}\.justice\.gov\/epstein\/files\/DataSet[^"]+)"')
-        links = pattern.findall(text)
-        # full_links = [f"https://www.justice.gov{link}" for link in links]
-        return links
+        """使用预编译的正则表达式提取文件链接"""
+        return self.extractor.extract(text)
             
     def download_original_webpage(self,data_set_number:int, start_page:int|None=None,max_pages:int|None=None):
         """下载数据集的原始网页内容并使用regex提取文件链接"""
-        self.data_set_number = data_set_number
-        self.data_set_url = f"{self.base_url}/data-set-{data_set_number}-files"
-        self.output_dir = self.dir_path / f"data-set-{data_set_number}"
-        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.open_data_set(data_set_number)
+        self.load_checkpoint()
         self.warmup_session()
         cur_page = start_page or 0
+        finished = completed = False
         try:
-            repeat_pages = 0
-            last_links_hash = None
-            while True:
-                if max_pages is not None and cur_page > max_pages:
-                    logger.info(f"数据集 {self.data_set_number} 达到最大页码限制 {max_pages}，停止提取。")
-                    break
-                page_url = f"{self.data_set_url}?page={cur_page}"
-                resp = self.make_request(page_url)
-                if resp:
-                    file_links = self.re_findall_files(resp.text)
-
-                    current_hash = self._hash_links(file_links)
-                    if last_links_hash == current_hash:
-                        repeat_pages += 1
-                        logger.info(f"数据集 {self.data_set_number} 页码 {cur_page} 与上一页内容一致, 连续重复: {repeat_pages}.")
-                    else:
-                        repeat_pages = 0
-                    last_links_hash = current_hash
-
-                    self.file_link_dict[cur_page] = file_links
-                    logger.info(f"已处理数据集 {self.data_set_number} 的第 {cur_page} 页, 提取到 {len(file_links)} 个文件链接.")
-
-                    if repeat_pages >= self.max_repeat_pages:
-                        logger.info(f"数据集 {self.data_set_number} 重复页达到阈值，停止提取。")
-                        break
-                else:
-                    logger.info(f"数据集 {self.data_set_number} 页码 {cur_page} 请求失败。")
-                    self.failed_pages.append(cur_page)
-                cur_page += 1
-                self.random_sleep()
+            if cur_page == 0 and self.max_workers > 1:
+                self._crawl_with_pager(max_pages)
+            else:
+                self._crawl_sequential(cur_page, max_pages)
             if self.failed_pages:
                 logger.info(f"数据集 {self.data_set_number} 以下页码请求失败: {self.failed_pages}")
                 self.retry_pages()
+            finished = True
+            completed = not self.failed_pages
         except Exception as e:
             logger.error(f"数据集 {self.data_set_number} 下载过程中发生错误: {e}")
         except KeyboardInterrupt:
-            logger.warning(f"数据集 {self.data_set_number} 下载被用户中断。")
+            logger.warning(f"数据集 {self.data_set_number} 下载被用户中断，下次运行将从检查点继续。")
         finally:
-            self.write_links_to_file()
+            self.checkpoint.close(done=completed)
+            # 爬取中途结束时只有部分页，不覆盖上次完整的链接JSON，已爬取的页保存在检查点中
+            if finished:
+                self.write_links_to_file()
+            self.write_links_diff()
+            self.page_cache.save()
             if self.failed_pages:
                 self.write_failed_pages_to_file()
+
+    def open_data_set(self, data_set_number:int):
+        """切换到指定数据集，读取上次的链接与条件请求缓存"""
+        self.data_set_number = data_set_number
+        self.data_set_url = f"{self.base_url}/data-set-{data_set_number}-files"
+        self.output_dir = self.dir_path / f"data-set-{data_set_number}"
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.load_previous_state()
+
+    def load_previous_state(self):
+        """读取上次爬取的链接JSON与条件请求缓存，用于增量爬取和差异对比"""
+        self.page_cache = PageCache(self.output_dir / f"dataset{self.data_set_number}_page_cache.json")
+        links_path = self.output_dir / f"dataset{self.data_set_number}_file_links.json"
+        if links_path.exists():
+            try:
+                with open(links_path, "r") as f:
+                    self.previous_links = {int(page): links for page, links in json.load(f).items()}
+            except (OSError, ValueError):
+                self.previous_links = {}
+
+    def load_checkpoint(self):
+        """读取上次未完成的爬取检查点，恢复已完成的页并从断点继续；上次已正常结束或不续爬时重新开始"""
+        self.checkpoint = CrawlCheckpoint(checkpoint_path(self.output_dir, self.data_set_number))
+        pages, done = self.checkpoint.load() if self.resume else ({}, True)
+        resume = bool(pages) and not done
+        self.checkpoint.open(resume)
+        if not resume:
+            return
+        logger.info(f"数据集 {self.data_set_number} 从检查点恢复 {len(pages)} 页，继续爬取剩余页。")
+        for page, file_links in sorted(pages.items()):
+            self.add_page_links(page, file_links, checkpoint=False)
+        self.done_pages = set(pages)
+
+    def _crawl_with_pager(self, max_pages:int|None = None):
+        """先请求第0页读取分页器中的末页页码，再并发请求剩余页；读不到分页器时退回逐页爬取"""
+        if 0 in self.done_pages and self.page_cache.last_page is not None:
+            last_page = self.page_cache.last_page
+            if max_pages is not None:
+                last_page = min(last_page, max_pages)
+            self._crawl_concurrent(page for page in range(1, last_page + 1) if page not in self.done_pages)
+            return
+        file_links, text = self.request_page(0)
+        if file_links is None:
+            logger.info(f"数据集 {self.data_set_number} 页码 0 请求失败，退回逐页爬取。")
+            self.failed_pages.append(0)
+            self._crawl_sequential(1, max_pages)
+            return
+        self.add_page_links(0, file_links)
+        logger.info(f"已处理数据集 {self.data_set_number} 的第 0 页, 提取到 {len(file_links)} 个文件链接.")
+        last_page = self.find_last_page(text) if text is not None else self.page_cache.last_page
+        self.page_cache.last_page = last_page
+        if last_page is None:
+            logger.info(f"数据集 {self.data_set_number} 未找到分页器，退回逐页爬取。")
+            self._crawl_sequential(1, max_pages, last_links_hash=self._hash_links(file_links))
+            return
+        if max_pages is not None:
+            last_page = min(last_page, max_pages)
+        logger.info(f"数据集 {self.data_set_number} 共 {last_page + 1} 页，开始并发爬取。")
+        self._crawl_concurrent(page for page in range(1, last_page + 1) if page not in self.done_pages)
+
+    def _fetch_page(self, page:int) -> tuple[int, list[str] | None]:
+        """限速后请求单个页码并提取链接，失败时返回None"""
+        self.rate_limiter.wait()
+        file_links, _ = self.request_page(page)
+        return page, file_links
+
+    def _crawl_concurrent(self, pages):
+        """在限速下并发请求给定页码，中断时取消尚未开始的请求"""
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            futures = [executor.submit(self._fetch_page, page) for page in pages]
+            for future in as_completed(futures):
+                page, file_links = future.result()
+                if file_links is None:
+                    logger.info(f"数据集 {self.data_set_number} 页码 {page} 请求失败。")
+                    self.failed_pages.append(page)
+                    continue
+                self.add_page_links(page, file_links)
+                logger.info(f"已处理数据集 {self.data_set_number} 的第 {page} 页, 提取到 {len(file_links)} 个文件链接.")
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _crawl_sequential(self, cur_page:int, max_pages:int|None = None, last_links_hash:str|None = None):
+        """逐页爬取，直到连续重复页达到阈值"""
+        repeat_pages = 0
+        while True:
+            if max_pages is not None and cur_page > max_pages:
+                logger.info(f"数据集 {self.data_set_number} 达到最大页码限制 {max_pages}，停止提取。")
+                break
+            restored = cur_page in self.done_pages
+            file_links = self.file_link_dict[cur_page] if restored else self.request_page(cur_page)[0]
+            if file_links is not None:
+                current_hash = self._hash_links(file_links)
+                if last_links_hash == current_hash:
+                    repeat_pages += 1
+                    logger.info(f"数据集 {self.data_set_number} 页码 {cur_page} 与上一页内容一致, 连续重复: {repeat_pages}.")
+                else:
+                    repeat_pages = 0
+                last_links_hash = current_hash
+
+                if not restored:
+                    self.add_page_links(cur_page, file_links)
+                    logger.info(f"已处理数据集 {self.data_set_number} 的第 {cur_page} 页, 提取到 {len(file_links)} 个文件链接.")
+
+                if repeat_pages >= self.max_repeat_pages:
+                    logger.info(f"数据集 {self.data_set_number} 重复页达到阈值，停止提取。")
+                    break
+            else:
+                logger.info(f"数据集 {self.data_set_number} 页码 {cur_page} 请求失败。")
+                self.failed_pages.append(cur_page)
+            cur_page += 1
+            if not restored:
+                self.random_sleep()
     
     def retry_pages(self):
         """重试下载失败的页码"""
@@ -135,11 +282,9 @@ class PageDownloader:
             current_failed = list(self.failed_pages)
             self.failed_pages = []
             for page in current_failed:
-                page_url = f"{self.data_set_url}?page={page}"
-                resp = self.make_request(page_url)
-                if resp:
-                    file_links = self.re_findall_files(resp.text)
-                    self.file_link_dict[page] = file_links
+                file_links, _ = self.request_page(page)
+                if file_links is not None:
+                    self.add_page_links(page, file_links)
                     logger.info(f"重试成功: 数据集 {self.data_set_number} 页码 {page}, 提取到 {len(file_links)} 个文件链接.")
                 else:
                     logger.error(f"重试失败: 数据集 {self.data_set_number} 页码 {page}.")
@@ -154,6 +299,54 @@ class PageDownloader:
             logger.info(f"所有失败页码已重试成功，无需继续重试。")
     
     
+    def refresh_pages(self, pages) -> dict[int, list[str]]:
+        """以条件请求刷新给定页码（需先 open_data_set），第0页同时更新末页页码；
+        链接有变化的页合并到已有链接并写回文件，返回 {页码: 新链接}"""
+        changed: dict[int, list[str]] = {}
+        for page in pages:
+            self.rate_limiter.wait()
+            file_links, text = self.request_page(page)
+            if file_links is None:
+                logger.info(f"数据集 {self.data_set_number} 页码 {page} 请求失败。")
+                continue
+            if text is not None:
+                # 第0页的分页器为准；其余页的分页器只可能把末页页码往后推
+                last_page = self.find_last_page(text)
+                if page == 0 or (last_page or 0) > (self.page_cache.last_page or 0):
+                    self.page_cache.last_page = last_page
+            if file_links != self.previous_links.get(page):
+                changed[page] = file_links
+                self.previous_links[page] = file_links
+        if changed:
+            self.file_link_dict = dict(self.previous_links)
+            self.write_links_to_file()
+            self.write_checkpoint_pages(changed)
+        self.page_cache.save()
+        return changed
+
+    def poll_newest(self, recent_pages:int = 2) -> dict[int, list[str]]:
+        """轮询第0页（读取分页器）与最新的 recent_pages 页，末页页码增大时一并请求新增的页；
+        第0页未变化(304)时由最新页的分页器发现新增的页"""
+        previous_last = self.page_cache.last_page
+        changed = self.refresh_pages([0])
+        last_page = self.page_cache.last_page
+        if not last_page:
+            return changed
+        start = max(1, min(previous_last if previous_last is not None else last_page, last_page) - recent_pages + 1)
+        while start <= last_page:
+            changed.update(self.refresh_pages(range(start, last_page + 1)))
+            start, last_page = last_page + 1, self.page_cache.last_page or 0
+        return changed
+
+    def write_checkpoint_pages(self, pages:dict[int, list[str]]):
+        """将刷新得到的页追加到流式链接文件；文件不存在时按全部链接重新生成"""
+        checkpoint = CrawlCheckpoint(checkpoint_path(self.output_dir, self.data_set_number))
+        exists = checkpoint.path.exists()
+        checkpoint.open(resume=exists)
+        for page, file_links in sorted((pages if exists else self.file_link_dict).items()):
+            checkpoint.append(page, file_links)
+        checkpoint.close(done=not exists)
+
     def write_links_to_file(self):
         """将提取的文件链接写入JSON文件"""
         data = self.file_link_dict
@@ -161,6 +354,25 @@ class PageDownloader:
         with open(self.output_dir / f"dataset{self.data_set_number}_file_links.json", "w") as f:
             json.dump(sorted_dict, f, indent=4)
             
+    def write_links_diff(self):
+        """对比上次爬取结果，将新增/移除的链接写入JSON文件"""
+        old_links = {link for links in self.previous_links.values() for link in links}
+        new_links = {link for links in self.file_link_dict.values() for link in links}
+        # 本次没有结果的页（请求失败、中断前未爬到）按上次的链接计，不算作移除
+        for page, links in self.previous_links.items():
+            if page not in self.file_link_dict:
+                new_links.update(links)
+        diff = {
+            "added": sorted(new_links - old_links),
+            "removed": sorted(old_links - new_links),
+            "crawled_pages": len(self.file_link_dict),
+            "unchanged_pages": sorted(set(self.unchanged_pages)),
+        }
+        with open(self.output_dir / f"dataset{self.data_set_number}_links_diff.json", "w") as f:
+            json.dump(diff, f, indent=4)
+        logger.info(f"数据集 {self.data_set_number} 新增链接 {len(diff['added'])} 个, 移除链接 {len(diff['removed'])} 个, "
+                    f"未变化页 {len(diff['unchanged_pages'])}/{len(self.file_link_dict)}.")
+
     def write_failed_pages_to_file(self):
         """将失败的页码写入文本文件"""
         with open(self.output_dir / f"dataset{self.data_set_number}_failed_pages.txt", "w") as f:
@@ -0,0 +1,4 @@
+from .textindex import TextIndex
+from .indexer import Indexer
+
+__all__ = ["TextIndex", "Indexer"]
@@ -0,0 +1,171 @@
+import hashlib
+import io
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from src.config import LOG_DIR, init_logger
+from src.metrics import metrics
+from src.pages import iter_data_set_links
+from src.files.archive import ArchiveShard, shard_path
+from src.files.verify import is_pdf
+from .textindex import TextIndex
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # 可选依赖，仅 index 命令需要
+    PdfReader = None
+
+def _read_source(path: str, offset: int, size: int | None):
+    """打开文件，或读取归档分片中 offset 起 size 字节的成员"""
+    if size is None:
+        return open(path, "rb")
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return io.BytesIO(f.read(size))
+
+def _sha256(stream) -> str:
+    hasher = hashlib.sha256()
+    while chunk := stream.read(1024 * 1024):
+        hasher.update(chunk)
+    stream.seek(0)
+    return hasher.hexdigest()
+
+def _init_worker():
+    # pypdf 对不规范的PDF会输出大量警告
+    logging.getLogger("pypdf").setLevel(logging.ERROR)
+
+def extract_document(task: tuple[str, str, int, int | None, str | None]) -> dict:
+    """在工作进程中计算SHA-256并提取PDF文本；大小相同只是mtime变化的文件，哈希与已索引的一致时不再提取"""
+    url, path, offset, size, known_sha256 = task
+    try:
+        stream = _read_source(path, offset, size)
+    except OSError as e:
+        return {"url": url, "missing": True, "error": str(e)}
+    with stream:
+        sha256 = _sha256(stream)
+        if known_sha256 == sha256:
+            return {"url": url, "unchanged": True, "sha256": sha256}
+        try:
+            reader = PdfReader(stream)
+            texts = [page.extract_text() or "" for page in reader.pages]
+            text, pages, error = "\n".join(texts).replace("\x00", ""), len(texts), None
+        except Exception as e:
+            text, pages, error = "", 0, f"{type(e).__name__}: {e}"
+    return {"url": url, "sha256": sha256, "text": text, "pages": pages, "error": error}
+
+class Indexer:
+    """增量全文索引：按链接JSON（或爬取检查点）列出数据集中已下载的文件，
+    只将新增或签名(路径、大小、mtime)变化的文件交给进程池提取文本，已不存在的文件从索引中移除"""
+    def __init__(self, file_dir: str|Path, page_dir: str|Path, index: TextIndex, max_workers: int | None = None,
+                 batch_size: int = 64):
+        if PdfReader is None:
+            raise ImportError("全文索引需要 pypdf，请先执行 pip install pypdf")
+        self.file_dir = Path(file_dir)
+        self.page_dir = Path(page_dir)
+        self.index = index
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.logger = init_logger('index', LOG_DIR / 'index.log')
+
+    def candidates(self, data_set_number: int) -> dict[str, dict] | None:
+        """已下载到本地的PDF文件 {url: 来源与签名}，链接文件不存在时返回None；
+        同一URL出现在多页时以最先出现的页为准（与下载清单登记的目录一致）；
+        视频、音频、表格等非PDF文件不提取文本，不进入进程池"""
+        page_links = iter_data_set_links(self.page_dir, data_set_number)
+        if page_links is None:
+            return None
+        data_set_dir = self.file_dir / f"data-set-{data_set_number}"
+        shards: dict[Path, ArchiveShard | None] = {}
+        found: dict[str, dict] = {}
+        seen: set[str] = set()
+        for page, link_list in page_links:
+            output_dir = data_set_dir / f"page_{page}"
+            for url in link_list:
+                if url in seen or not is_pdf(url):
+                    continue
+                seen.add(url)
+                name = url.split("/")[-1]
+                doc = {"url": url, "data_set": data_set_number, "page": page, "name": name}
+                try:
+                    stat = (output_dir / name).stat()
+                except OSError:
+                    stat = None
+                if stat is not None:
+                    found[url] = {**doc, "path": (output_dir / name).as_posix(), "file": str(output_dir / name),
+                                  "offset": 0, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "member": False}
+                    continue
+                # 归档模式：文件在分片中，以分片路径与成员偏移作为签名
+                archive = shard_path(output_dir)
+                if archive not in shards:
+                    shards[archive] = ArchiveShard(archive) if archive.exists() else None
+                member = shards[archive].members().get(name) if shards[archive] is not None else None
+                if member is not None:
+                    found[url] = {**doc, "path": f"{archive.as_posix()}#{member['offset']}", "file": str(archive),
+                                  "offset": member["offset"], "size": member["size"], "mtime_ns": 0, "member": True}
+        return found
+
+    def run(self, data_set_number: int, full: bool = False) -> dict | None:
+        """增量索引一个数据集，full 为True时重新提取全部文件；返回汇总，链接文件不存在时返回None"""
+        begin = time.monotonic()
+        candidates = self.candidates(data_set_number)
+        if candidates is None:
+            self.logger.error(f"数据集 {data_set_number} 的链接JSON文件未找到，无法建立索引。请先运行page命令下载并提取链接。")
+            return None
+        signatures = self.index.signatures(data_set_number)
+        removed = [url for url in signatures if url not in candidates]
+        tasks: list[tuple[str, str, int, int | None, str | None]] = []
+        unchanged = 0
+        for url, doc in candidates.items():
+            signature = signatures.get(url)
+            if not full and signature is not None and signature[:3] == (doc["path"], doc["size"], doc["mtime_ns"]):
+                unchanged += 1
+                continue
+            # 大小一致时可能只是mtime变化，交给工作进程比较哈希
+            known = signature[3] if not full and signature is not None and signature[1] == doc["size"] else None
+            tasks.append((url, doc["file"], doc["offset"], doc["size"] if doc["member"] else None, known))
+        self.logger.info(f"数据集 {data_set_number} 共 {len(candidates)} 个已下载文件，{unchanged} 个未变化，"
+                         f"{len(tasks)} 个需提取文本，{len(removed)} 个已不存在。")
+
+        indexed = touched = failed = 0
+        batch: list[dict] = []
+        touches: list[tuple[str, str, int, int]] = []
+        with ProcessPoolExecutor(max_workers=self.max_workers or None, initializer=_init_worker) as executor:
+            for result in executor.map(extract_document, tasks, chunksize=4):
+                doc = candidates[result["url"]]
+                if result.get("missing"):
+                    continue
+                if result.get("unchanged"):
+                    touches.append((doc["url"], doc["path"], doc["size"], doc["mtime_ns"]))
+                    touched += 1
+                    continue
+                if result["error"]:
+                    failed += 1
+                    self.logger.warning(f"提取文本失败: {doc['url']}: {result['error']}")
+                batch.append({**doc, **result})
+                indexed += 1
+                if len(batch) >= self.batch_size:
+                    self.index.upsert(batch)
+                    batch.clear()
+        if batch:
+            self.index.upsert(batch)
+        if touches:
+            self.index.touch(touches)
+        if removed:
+            self.index.remove(removed)
+        if indexed or removed:
+            self.index.optimize()
+        metrics.inc("index_documents_total", indexed, result="indexed")
+        metrics.inc("index_documents_total", failed, result="failed")
+        summary = {
+            "data_set": data_set_number,
+            "files": len(candidates),
+            "indexed": indexed,
+            "unchanged": unchanged + touched,
+            "failed": failed,
+            "removed": len(removed),
+            "seconds": round(time.monotonic() - begin, 3),
+        }
+        self.logger.info(f"数据集 {data_set_number} 索引完成: 新提取 {indexed} 个（失败 {failed}），"
+                         f"未变化 {summary['unchanged']} 个，移除 {len(removed)} 个，用时 {summary['seconds']}s。")
+        return summary
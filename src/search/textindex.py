@@ -0,0 +1,117 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    data_set INTEGER NOT NULL,
+    page TEXT NOT NULL,
+    name TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT,
+    pages INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    indexed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_documents_data_set ON documents (data_set);
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(name, body, tokenize = 'unicode61 remove_diacritics 2');
+"""
+
+class TextIndex:
+    """基于SQLite FTS5的全文索引：documents 记录每个文件的来源(数据集/页/URL)与签名(路径、大小、mtime、SHA-256)，
+    documents_fts 以相同的 rowid 保存提取的文本"""
+    def __init__(self, db_path: str|Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self.conn.commit()
+
+    def signatures(self, data_set: int) -> dict[str, tuple[str, int, int, str | None]]:
+        """已索引文件的签名 {url: (路径, 大小, mtime_ns, sha256)}"""
+        with self._lock:
+            rows = self.conn.execute("SELECT url, path, size, mtime_ns, sha256 FROM documents WHERE data_set = ?",
+                                     (data_set,)).fetchall()
+        return {url: (path, size, mtime_ns, sha256) for url, path, size, mtime_ns, sha256 in rows}
+
+    def upsert(self, documents: list[dict]):
+        """在一个事务中写入一批文档，已存在的URL替换其文本"""
+        now = time.time()
+        with self._lock, self.conn:
+            for doc in documents:
+                row = self.conn.execute("SELECT doc_id FROM documents WHERE url = ?", (doc["url"],)).fetchone()
+                values = (doc["data_set"], str(doc["page"]), doc["name"], doc["path"], doc["size"], doc["mtime_ns"],
+                          doc["sha256"], doc["pages"], doc["error"], now)
+                if row is None:
+                    doc_id = self.conn.execute(
+                        "INSERT INTO documents (data_set, page, name, path, size, mtime_ns, sha256, pages, error, indexed_at, url) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", (*values, doc["url"])).lastrowid
+                else:
+                    doc_id = row[0]
+                    self.conn.execute(
+                        "UPDATE documents SET data_set = ?, page = ?, name = ?, path = ?, size = ?, mtime_ns = ?, sha256 = ?, "
+                        "pages = ?, error = ?, indexed_at = ? WHERE url = ?", (*values, doc["url"]))
+                    self.conn.execute("DELETE FROM documents_fts WHERE rowid = ?", (doc_id,))
+                self.conn.execute("INSERT INTO documents_fts (rowid, name, body) VALUES (?, ?, ?)",
+                                  (doc_id, doc["name"], doc["text"]))
+
+    def touch(self, signatures: list[tuple[str, str, int, int]]):
+        """内容未变（哈希一致）只是路径或mtime变化的文件，仅更新签名 (url, 路径, 大小, mtime_ns)"""
+        with self._lock, self.conn:
+            self.conn.executemany("UPDATE documents SET path = ?, size = ?, mtime_ns = ? WHERE url = ?",
+                                  [(path, size, mtime_ns, url) for url, path, size, mtime_ns in signatures])
+
+    def remove(self, urls: list[str]):
+        """移除已不存在的文件"""
+        with self._lock, self.conn:
+            for url in urls:
+                row = self.conn.execute("SELECT doc_id FROM documents WHERE url = ?", (url,)).fetchone()
+                if row is not None:
+                    self.conn.execute("DELETE FROM documents_fts WHERE rowid = ?", (row[0],))
+                    self.conn.execute("DELETE FROM documents WHERE doc_id = ?", (row[0],))
+
+    def search(self, query: str, limit: int = 20, data_set: int | None = None) -> list[dict]:
+        """全文检索，按 bm25 相关度排序；query 为 FTS5 查询语法，语法错误时按普通词组检索"""
+        try:
+            return self._search(query, limit, data_set)
+        except sqlite3.OperationalError:
+            terms = " ".join('"' + term.replace('"', '""') + '"' for term in query.split())
+            return self._search(terms, limit, data_set) if terms else []
+
+    def _search(self, query: str, limit: int, data_set: int | None) -> list[dict]:
+        sql = ("SELECT d.url, d.data_set, d.page, d.name, d.path, "
+               "snippet(documents_fts, 1, '[', ']', '…', 16), bm25(documents_fts) "
+               "FROM documents_fts JOIN documents d ON d.doc_id = documents_fts.rowid WHERE documents_fts MATCH ?")
+        params: list = [query]
+        if data_set is not None:
+            sql += " AND d.data_set = ?"
+            params.append(data_set)
+        sql += " ORDER BY bm25(documents_fts) LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [{"url": url, "data_set": data_set_number, "page": page, "name": name, "path": path,
+                 "snippet": snippet, "score": round(-score, 3)}
+                for url, data_set_number, page, name, path, snippet, score in rows]
+
+    def stats(self) -> dict[int, int]:
+        """各数据集已索引的文件数"""
+        with self._lock:
+            return dict(self.conn.execute("SELECT data_set, COUNT(*) FROM documents GROUP BY data_set").fetchall())
+
+    def optimize(self):
+        """合并FTS5的段，大量写入后执行可加快检索"""
+        with self._lock, self.conn:
+            self.conn.execute("INSERT INTO documents_fts (documents_fts) VALUES ('optimize')")
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,3 @@
+from .scheduler import SyncScheduler
+
+__all__ = ["SyncScheduler"]
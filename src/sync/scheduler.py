@@ -0,0 +1,110 @@
+import itertools
+import queue
+import threading
+import time
+from requests import Session
+from src.config import LOG_DIR, init_logger
+from src.pages import PageDownloader, check_repeats
+from src.files import FileDownloader
+from src.metrics import metrics
+
+_LAST = (float("inf"), 0)
+
+class SyncScheduler:
+    """跨数据集的全局调度：爬虫边爬边将链接放入全局优先队列，由同一个下载线程池消费，
+    数据集之间不再等待线程池清空，page 与 file 阶段流水线执行"""
+    def __init__(self, session: Session, downloader: FileDownloader, page_kwargs: dict, workers: int | None = None):
+        self.session = session
+        self.downloader = downloader
+        self.page_kwargs = page_kwargs
+        self.workers = workers or downloader.max_workers
+        self.logger = init_logger('sync', LOG_DIR / 'sync.log')
+        self.tasks: queue.PriorityQueue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._stop = threading.Event()
+        self._completed: dict[str, int] = {}
+        self._sizes: dict[int, dict[str, int]] = {}
+        self._stats_lock = threading.Lock()
+        self.stats = {"queued": 0, "success": 0, "failed": 0}
+
+    def enqueue_page(self, priority: int, data_set_number: int, page: int, links: list[str]):
+        """登记一页链接并将需要下载的文件放入全局队列，优先级按 (数据集顺序, 页码)"""
+        if self._stop.is_set():
+            return
+        rows = self.downloader.register_page(data_set_number, page, links)
+        if data_set_number not in self._sizes:
+            self._sizes[data_set_number] = self.downloader.manifest.expected_sizes(data_set_number)
+        tasks = self.downloader.prepare_tasks(data_set_number, rows, self._completed, self._sizes[data_set_number])
+        for folder, url, file_path in tasks:
+            self.tasks.put(((priority, int(page)), next(self._seq), (data_set_number, url, file_path)))
+        with self._stats_lock:
+            self.stats["queued"] += len(tasks)
+        metrics.set("queue_depth", self.tasks.qsize())
+
+    def crawl(self, data_sets: list[int]):
+        """生产者：依次爬取各数据集，每得到一页链接就入队"""
+        for priority, data_set_number in enumerate(data_sets):
+            if self._stop.is_set():
+                break
+            self.downloader.migrate_status_json(data_set_number)
+            on_page = lambda page, links, p=priority, n=data_set_number: self.enqueue_page(p, n, page, links)
+            crawler = PageDownloader(session=self.session, on_page=on_page, **self.page_kwargs)
+            crawler.download_original_webpage(data_set_number)
+            try:
+                check_repeats(data_set_number)
+            except OSError:
+                pass
+            self.logger.info(f"数据集 {data_set_number} 爬取完成，当前队列长度 {self.tasks.qsize()}。")
+
+    def work(self):
+        """消费者：从全局队列取任务下载，直到收到停止标记"""
+        while True:
+            _, _, item = self.tasks.get()
+            try:
+                if item is None:
+                    return
+                if self._stop.is_set():
+                    continue
+                data_set_number, url, file_path = item
+                metrics.set("queue_depth", self.tasks.qsize())
+                try:
+                    url, status, reason = self.downloader.download_file(url, file_path, self.downloader.max_retry_times)
+                    self.downloader.record_result(data_set_number, url, file_path, status, reason)
+                except Exception as e:
+                    # 未归类的异常（如创建目录、重命名或写清单失败）只让这一项失败，不结束工作线程
+                    status = "failed"
+                    self.logger.error(f"下载 {url} 时发生错误: {type(e).__name__}: {e}")
+                    try:
+                        self.downloader.record_result(data_set_number, url, file_path, status, f"{type(e).__name__}: {e}")
+                    except Exception as record_error:
+                        self.logger.error(f"记录 {url} 的失败结果时发生错误: {record_error}")
+                with self._stats_lock:
+                    self.stats[status] = self.stats.get(status, 0) + 1
+            finally:
+                self.tasks.task_done()
+
+    def run(self, data_sets: list[int]):
+        """启动爬虫与下载线程池，全部完成后导出各数据集的 downloads_status.json"""
+        self._completed = self.downloader.manifest.completed_sizes()
+        workers = [threading.Thread(target=self.work, name=f"sync-worker-{i}", daemon=True) for i in range(self.workers)]
+        for worker in workers:
+            worker.start()
+        producer = threading.Thread(target=self.crawl, args=(data_sets,), name="sync-crawler", daemon=True)
+        producer.start()
+        try:
+            while producer.is_alive():
+                producer.join(0.5)
+            # 等待队列清空；用带超时的轮询以便响应 Ctrl-C
+            while self.tasks.unfinished_tasks:
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            self.logger.warning("同步被用户中断，等待进行中的下载结束。")
+            self._stop.set()
+        finally:
+            for _ in workers:
+                self.tasks.put((_LAST, next(self._seq), None))
+            for worker in workers:
+                worker.join()
+            for data_set_number in data_sets:
+                self.downloader.write_status_json(data_set_number)
+            self.logger.info(f"同步结束: 入队 {self.stats['queued']}, 成功 {self.stats['success']}, 失败 {self.stats['failed']}")
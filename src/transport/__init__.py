@@ -0,0 +1,27 @@
+from requests import Session
+from .policy import RetryPolicy, parse_retry_after
+from .session import TransportAdapter, DEFAULT_HEADERS, new_session
+from .http2 import Http2Adapter
+
+def build_session(pool_size: int = 10, config=None) -> Session:
+    """按并发数构建共享会话：连接池容量不小于并发数，连接层不重试，超时与 HTTP/2 由配置 HTTP__* 决定"""
+    if config is None:
+        from src.config.base import TransportConfig
+        config = TransportConfig()
+    pool_maxsize = config.pool_maxsize or max(10, pool_size)
+    timeout = (config.connect_timeout, config.read_timeout)
+    if config.http2:
+        adapter = Http2Adapter(max_connections=pool_maxsize, timeout=timeout)
+    else:
+        adapter = TransportAdapter(pool_connections=config.pool_connections, pool_maxsize=pool_maxsize, timeout=timeout)
+    return new_session(adapter)
+
+def build_policy(config=None) -> RetryPolicy:
+    """按配置创建重试退避策略"""
+    if config is None:
+        from src.config.base import TransportConfig
+        config = TransportConfig()
+    return RetryPolicy(config.backoff_base, config.backoff_cap, config.backoff_jitter)
+
+__all__ = ["build_session", "build_policy", "RetryPolicy", "parse_retry_after",
+           "TransportAdapter", "Http2Adapter", "DEFAULT_HEADERS", "new_session"]
@@ -0,0 +1,106 @@
+import io
+import time
+from datetime import timedelta
+from requests import Response
+from requests.adapters import BaseAdapter
+from requests.exceptions import ChunkedEncodingError, ConnectTimeout, ConnectionError, ReadTimeout
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+try:
+    import httpx
+except ImportError:  # 可选依赖，仅 HTTP/2 传输需要
+    httpx = None
+
+class _HttpxStream(io.RawIOBase):
+    """将 httpx 的流式响应体包装为 requests 可读取的 raw 对象（内容已解压）"""
+    def __init__(self, response: "httpx.Response"):
+        self.response = response
+        self._chunks = response.iter_bytes()
+        self._buffer = b""
+        self._error: Exception | None = None
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        if self._error is None:
+            try:
+                while size < 0 or len(self._buffer) < size:
+                    chunk = next(self._chunks, None)
+                    if chunk is None:
+                        break
+                    self._buffer += chunk
+            except httpx.TimeoutException as e:
+                self._error = ReadTimeout(e)
+            except httpx.HTTPError as e:
+                self._error = ChunkedEncodingError(e)
+        # 出错前已收到的数据先交给上层（续传时不丢失），下一次读取再抛出错误
+        if self._error is not None and not self._buffer:
+            raise self._error
+        if size < 0:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def close(self):
+        self.response.close()
+        super().close()
+
+    def release_conn(self):
+        self.close()
+
+class Http2Adapter(BaseAdapter):
+    """基于 httpx 的 HTTP/2 适配器：多个请求复用同一连接上的多路流，对上层仍是 requests 的接口"""
+    def __init__(self, max_connections: int = 10, timeout: tuple[float, float] | None = (10.0, 20.0)):
+        if httpx is None:
+            raise ImportError("HTTP/2 传输需要 httpx[http2]，请先执行 pip install 'httpx[http2]'")
+        super().__init__()
+        self.timeout = timeout
+        self.client = httpx.Client(http2=True, follow_redirects=False,
+                                   limits=httpx.Limits(max_connections=max_connections,
+                                                       max_keepalive_connections=max_connections))
+
+    def _timeout(self, timeout) -> "httpx.Timeout":
+        timeout = timeout if timeout is not None else self.timeout
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            return httpx.Timeout(read, connect=connect)
+        return httpx.Timeout(timeout)
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        httpx_request = self.client.build_request(request.method, request.url, headers=dict(request.headers),
+                                                  content=request.body)
+        httpx_request.extensions["timeout"] = self._timeout(timeout).as_dict()
+        start = time.perf_counter()
+        try:
+            httpx_response = self.client.send(httpx_request, stream=True)
+            # 与 requests 自带适配器一致：从发出请求到收到响应头的耗时
+            elapsed = timedelta(seconds=time.perf_counter() - start)
+        except httpx.ConnectTimeout as e:
+            raise ConnectTimeout(e, request=request)
+        except httpx.TimeoutException as e:
+            raise ReadTimeout(e, request=request)
+        except httpx.HTTPError as e:
+            raise ConnectionError(e, request=request)
+
+        response = Response()
+        response.status_code = httpx_response.status_code
+        # 响应体已由 httpx 解压，去掉编码头以免上层重复处理
+        response.headers = CaseInsensitiveDict((key, value) for key, value in httpx_response.headers.items()
+                                               if key.lower() != "content-encoding")
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.elapsed = elapsed
+        response.raw = _HttpxStream(httpx_response)
+        response.reason = httpx_response.reason_phrase
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.cookies.update(dict(httpx_response.cookies))
+        if not stream:
+            response.content
+        return response
+
+    def close(self):
+        self.client.close()
@@ -0,0 +1,26 @@
+import random
+import time
+
+def parse_retry_after(value: str | None) -> float | None:
+    """解析以秒表示的 Retry-After 响应头"""
+    try:
+        return max(0.0, float(value)) if value else None
+    except ValueError:
+        return None
+
+class RetryPolicy:
+    """统一的重试退避策略：第 attempt 次失败后等待 base * 2^(attempt-1) 秒（不超过cap）并加随机抖动，
+    服务器给出 Retry-After 时以其为准。连接层不再自动重试，重试次数由各调用方的 max_retry_times 决定"""
+    def __init__(self, base: float = 2.0, cap: float = 60.0, jitter: float = 0.3):
+        self.base = base
+        self.cap = cap
+        self.jitter = jitter
+
+    def delay(self, attempt: int, retry_after: float | None = None) -> float:
+        if retry_after is not None:
+            return min(retry_after, self.cap)
+        delay = min(self.cap, self.base * (2 ** (max(1, attempt) - 1)))
+        return delay + random.uniform(0, delay * self.jitter)
+
+    def sleep(self, attempt: int, retry_after: float | None = None):
+        time.sleep(self.delay(attempt, retry_after))
@@ -0,0 +1,32 @@
+from requests import Session
+from requests.adapters import HTTPAdapter
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:122.0) Gecko/20100101 Firefox/122.0",
+    'Referer': 'https://www.justice.gov/epstein/doj-disclosures',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+    'DNT': '1',
+    'cookie': 'justiceGovAgeVerified=true'
+}
+
+class TransportAdapter(HTTPAdapter):
+    """连接池大小与并发数匹配的适配器：不做连接层重试，未指定超时的请求使用默认 (连接, 读取) 超时"""
+    def __init__(self, pool_connections: int = 4, pool_maxsize: int = 10,
+                 timeout: tuple[float, float] | None = (10.0, 20.0), **kwargs):
+        self.timeout = timeout
+        super().__init__(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0, **kwargs)
+
+    def send(self, request, timeout=None, **kwargs):
+        return super().send(request, timeout=timeout if timeout is not None else self.timeout, **kwargs)
+
+def new_session(adapter: HTTPAdapter) -> Session:
+    """创建挂载指定适配器、带默认请求头的会话"""
+    session = Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(DEFAULT_HEADERS)
+    return session
@@ -0,0 +1,3 @@
+from .ratelimit import RateLimiter
+
+__all__ = ["RateLimiter"]
@@ -0,0 +1,21 @@
+import threading
+import time
+
+class RateLimiter:
+    """线程安全的限速器，保证相邻两次请求的开始时间间隔不小于 1/rate 秒"""
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_time = 0.0
+
+    def wait(self):
+        """阻塞直到允许发出下一次请求"""
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_time)
+            self._next_time = start + self.interval
+        delay = start - now
+        if delay > 0:
+            time.sleep(delay)
@@ -0,0 +1,3 @@
+from .watcher import Watcher
+
+__all__ = ["Watcher"]
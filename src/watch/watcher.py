@@ -0,0 +1,119 @@
+import re
+import time
+from pathlib import Path
+from requests import Session
+from src.config import LOG_DIR, init_logger
+from src.pages import PageDownloader
+from src.files import FileDownloader
+from src.metrics import metrics
+
+_DATA_SET_LINK = re.compile(r'data-set-(\d+)-files')
+
+class Watcher:
+    """常驻轮询：定期检查 doj-disclosures 索引页中的数据集与各数据集最新的列表页，
+    新数据集完整爬取，已有数据集只条件请求第0页与最新几页，新增链接直接交给下载器。
+    会话连接池与各数据集的链接、条件请求缓存在轮询之间保留在内存中"""
+    def __init__(self, session: Session, downloader: FileDownloader | None, page_kwargs: dict,
+                 interval: float = 3600.0, recent_pages: int = 2):
+        self.session = session
+        self.downloader = downloader
+        self.page_kwargs = page_kwargs
+        self.interval = interval
+        self.recent_pages = recent_pages
+        self.index_url = page_kwargs["base_url"]
+        self.page_dir = Path(page_kwargs["dir_path"])
+        self.logger = init_logger('watch', LOG_DIR / 'watch.log')
+        self.crawlers: dict[int, PageDownloader] = {}
+        self.index_headers: dict[str, str] = {}
+        self.data_sets: list[int] = []
+
+    def known_data_sets(self) -> set[int]:
+        """本地已爬取过的数据集"""
+        known = set()
+        for path in self.page_dir.glob("data-set-*"):
+            number = path.name.rsplit("-", 1)[-1]
+            if number.isdigit() and any(path.glob("dataset*_file_links.*")):
+                known.add(int(number))
+        return known
+
+    def discover(self) -> list[int]:
+        """条件请求索引页，返回其中列出的数据集编号；索引未变化(304)或请求失败时沿用上次结果"""
+        try:
+            resp = self.session.get(self.index_url, headers=self.index_headers or None)
+            if resp.status_code != 304:
+                resp.raise_for_status()
+                self.data_sets = sorted({int(number) for number in _DATA_SET_LINK.findall(resp.text)})
+                self.index_headers = {key: value for key, value in (("If-None-Match", resp.headers.get("ETag")),
+                                                                    ("If-Modified-Since", resp.headers.get("Last-Modified")))
+                                      if value}
+        except Exception as e:
+            self.logger.error(f"索引页请求失败: {e}")
+        return self.data_sets
+
+    def crawler_for(self, data_set_number: int) -> PageDownloader:
+        """各数据集的爬虫只在首次使用时从磁盘读取状态，之后常驻内存"""
+        if data_set_number not in self.crawlers:
+            crawler = PageDownloader(session=self.session, **self.page_kwargs)
+            crawler.open_data_set(data_set_number)
+            self.crawlers[data_set_number] = crawler
+        return self.crawlers[data_set_number]
+
+    def crawl_new(self, data_set_number: int) -> dict[int, list[str]]:
+        """完整爬取新出现的数据集，返回全部链接"""
+        self.logger.info(f"发现新数据集 {data_set_number}，开始完整爬取。")
+        crawler = PageDownloader(session=self.session, **self.page_kwargs)
+        crawler.download_original_webpage(data_set_number)
+        crawler.open_data_set(data_set_number)
+        self.crawlers[data_set_number] = crawler
+        return dict(crawler.previous_links)
+
+    def poll(self, data_set_number: int) -> dict[int, list[str]]:
+        """轮询已有数据集的最新页，返回 {页码: 新增链接}"""
+        crawler = self.crawler_for(data_set_number)
+        seen = {link for links in crawler.previous_links.values() for link in links}
+        changed = crawler.poll_newest(self.recent_pages)
+        return {page: new for page, links in changed.items() if (new := [link for link in links if link not in seen])}
+
+    def feed(self, data_set_number: int, pages: dict[int, list[str]]):
+        """登记新增链接并下载"""
+        if self.downloader is None or not pages:
+            return
+        self.downloader.migrate_status_json(data_set_number)
+        rows = [row for page, links in sorted(pages.items())
+                for row in self.downloader.register_page(data_set_number, page, links)]
+        self.downloader.download_rows(data_set_number, rows)
+
+    def run_cycle(self) -> dict[int, int]:
+        """执行一轮轮询，返回 {数据集: 新增链接数}"""
+        known = self.known_data_sets()
+        found: dict[int, int] = {}
+        for data_set_number in sorted(set(self.discover()) | known):
+            if data_set_number in known or data_set_number in self.crawlers:
+                pages = self.poll(data_set_number)
+            else:
+                pages = self.crawl_new(data_set_number)
+            count = sum(len(links) for links in pages.values())
+            if count:
+                found[data_set_number] = count
+                self.logger.info(f"数据集 {data_set_number} 新增 {count} 个链接（{len(pages)} 页）。")
+                self.feed(data_set_number, pages)
+        metrics.inc("watch_cycles_total")
+        metrics.inc("watch_new_links_total", sum(found.values()))
+        return found
+
+    def run(self, once: bool = False):
+        """循环轮询，直到被中断；once 为True时只执行一轮。单轮出错（如清单被其他进程锁定、写入失败）只记录日志，下一轮照常进行"""
+        try:
+            while True:
+                started = time.monotonic()
+                try:
+                    found = self.run_cycle()
+                    self.logger.info(f"本轮轮询完成，用时 {time.monotonic() - started:.1f}s，新增链接: {found or '无'}。")
+                except Exception as e:
+                    metrics.inc("watch_cycle_errors_total")
+                    self.logger.error(f"本轮轮询失败，{self.interval:.0f}s 后重试: {type(e).__name__}: {e}")
+                if once:
+                    return
+                time.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+        except KeyboardInterrupt:
+            self.logger.warning("轮询被用户中断。")